@@ -1,9 +1,18 @@
+import multiprocessing
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Union
 
 import yaml
 import rdflib
 from pathlib import Path
+from semantic_iot.utils.containment import ContainmentIndex
+from semantic_iot.utils.emitter import RecordEmitter, SafeDumper
+from semantic_iot.utils.http_index import HttpRequestIndex
+from semantic_iot.utils.kg_store import is_kg_store, load_graph
+from semantic_iot.utils.query import run_query
+from semantic_iot.pipeline import file_digest
 
 # --- SPARQL queries ------------------------------------------------------------
 
@@ -51,6 +60,69 @@ query_sensor_by_type = """
     }
 """
 
+# --- Bulk queries: answer each query type once for all rooms -------------------
+
+query_ventilation_devices_all_rooms = """
+    PREFIX rec:    <https://w3id.org/rec#>
+    PREFIX brick: <https://brickschema.org/schema/Brick#>
+    PREFIX rdf:   <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+
+    SELECT ?room ?device ?actuation ?actuation_access
+    WHERE {
+      ?device a brick:Air_System .
+      ?actuation brick:isPointOf ?device .
+      OPTIONAL {
+        ?actuation a ?actuation_type ;
+                   rdf:value ?actuation_access .
+        VALUES ?actuation_type { brick:Setpoint brick:Command }
+      }
+
+      ?actuation (brick:isPointOf|brick:hasLocation|brick:isPartOf)* ?room .
+      ?room a rec:Room .
+}
+"""
+
+query_sensor_by_type_all_rooms = """
+    PREFIX rec:  <https://w3id.org/rec#>
+    PREFIX brick:<https://brickschema.org/schema/Brick#>
+    PREFIX rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+
+    SELECT ?room ?sensor ?sensor_access
+    WHERE {
+      ?sensor a ?SENSOR_TYPE .
+      ?sensor rdf:value ?sensor_access .
+      ?sensor (brick:isPointOf|brick:hasLocation|brick:isPartOf)* ?room .
+      ?room a rec:Room .
+    }
+"""
+
+# Room-free variants, the rooms are looked up in the containment index
+query_ventilation_actuations = """
+    PREFIX brick: <https://brickschema.org/schema/Brick#>
+    PREFIX rdf:   <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+
+    SELECT ?device ?actuation ?actuation_access
+    WHERE {
+      ?device a brick:Air_System .
+      ?actuation brick:isPointOf ?device .
+      OPTIONAL {
+        ?actuation a ?actuation_type ;
+                   rdf:value ?actuation_access .
+        VALUES ?actuation_type { brick:Setpoint brick:Command }
+      }
+}
+"""
+
+query_sensors_of_type = """
+    PREFIX rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+
+    SELECT ?sensor ?sensor_access
+    WHERE {
+      ?sensor a ?SENSOR_TYPE .
+      ?sensor rdf:value ?sensor_access .
+    }
+"""
+
 query_http_request_by_uri_and_method = """
     PREFIX http: <http://www.w3.org/2011/http#>
     SELECT ?req ?method ?absPath ?absUri ?authority
@@ -94,17 +166,28 @@ class ControllerConfiguration:
     BRICK_CO2_SENSOR = rdflib.URIRef("https://brickschema.org/schema/Brick#CO2_Sensor")
     BRICK_PRESENCE_SENSOR = rdflib.URIRef("https://brickschema.org/schema/Brick#Occupancy_Count_Sensor")
 
-    def __init__(self, rdf_kg_path: str, output_file: str):
+    def __init__(self, rdf_kg_path: str, output_file: str, index_cache_dir: str = None,
+                 graph: rdflib.Graph = None):
         """
         Args:
-            rdf_kg_path (str): Path to the RDF knowledge graph (Turtle format).
+            rdf_kg_path (str): Path to the RDF knowledge graph (Turtle format, or SQLite
+                store, see semantic_iot.utils.kg_store).
             output_file (str): Path to the controller configuration file (YAML).
+            index_cache_dir (str): Optional directory in which the containment and HTTP
+                indexes of the KG are persisted, keyed by the content digest of the KG.
+                By default, the indexes are only kept in memory.
+            graph (rdflib.Graph): The already loaded KG of rdf_kg_path, if any.
         """
         self.rdf_kg_path = rdf_kg_path
         self.output_file = output_file
-        self.graph = rdflib.Graph()
+        self.index_cache_dir = index_cache_dir
+        self._indexes = {}
+        if graph is not None:
+            self.graph = graph
+            return
         print(f"Parsing Knowledge Graph from: {self.rdf_kg_path}")
-        self.graph.parse(self.rdf_kg_path, format="turtle")
+        # a SQLite store (.sqlite, .db) is opened read-only instead of being parsed
+        self.graph = load_graph(self.rdf_kg_path)
         print("Parsing complete.")
 
     # ---------- internal helpers ----------
@@ -130,9 +213,10 @@ class ControllerConfiguration:
         """
         if abs_uri_term is None:
             return []
-        return list(self.graph.query(
+        return list(run_query(
+            self.graph,
             query_http_request_by_uri_and_method,
-            initBindings={
+            init_bindings={
                 rdflib.Variable("ABS_URI"): abs_uri_term,
                 rdflib.Variable("WANT_METHOD"): rdflib.Literal(want_method),
             }
@@ -140,9 +224,10 @@ class ControllerConfiguration:
 
     def _collect_http_headers(self, req_iri):
         headers = {}
-        for name, value in self.graph.query(
+        for name, value in run_query(
+                self.graph,
                 query_http_headers,
-                initBindings={rdflib.Variable("req"): req_iri}
+                init_bindings={rdflib.Variable("req"): req_iri}
         ):
             n, v = self._clean(name), self._clean(value)
             if n:  # Only check for name
@@ -151,9 +236,10 @@ class ControllerConfiguration:
 
     def _collect_http_params(self, req_iri):
         params = {}
-        for pname, pvalue in self.graph.query(
+        for pname, pvalue in run_query(
+                self.graph,
                 query_http_params,
-                initBindings={rdflib.Variable("req"): req_iri}
+                init_bindings={rdflib.Variable("req"): req_iri}
         ):
             n, v = self._clean(pname), self._clean(pvalue)
             if n:  # Only check for name
@@ -166,100 +252,332 @@ class ControllerConfiguration:
         for method in want_method:
             rows = self._query_http_by_uri_and_method(abs_uri_term, method)
             if not rows:
-                return None
+                # try the next method
+                continue
             req, method, absPath, absUri, authority = rows[0]
             headers = self._collect_http_headers(req)
             params = self._collect_http_params(req)
-            return {
-                "method": self._clean(method),
-                "url": self._clean(absUri),
-                # "path": self._clean(absPath),
-                # "authority": self._clean(authority),
-                "headers": headers or None,
-                "params": params or None,
-                "request_node": str(req),
-            }
+            return self._http_entry(req, method, absUri, headers, params)
         return None
 
+    def _http_entry(self, req, method, abs_uri, headers: dict, params: dict) -> dict:
+        return {
+            "method": self._clean(method),
+            "url": self._clean(abs_uri),
+            "headers": headers or None,
+            "params": params or None,
+            "request_node": str(req),
+        }
+
+    # ---------- indexed HTTP resolution ----------
+    def _resolve_http_from_index(self, index: HttpRequestIndex, abs_uri_term,
+                                 want_method: Union[str, List[str]]):
+        request = index.resolve(abs_uri_term, want_method)
+        if request is None:
+            return None
+        headers = {}
+        for name, value in request.headers.items():
+            n, v = self._clean(name), self._clean(value)
+            if n:
+                headers[n] = v
+        params = {}
+        for pname, pvalue in request.params.items():
+            n, v = self._clean(pname), self._clean(pvalue)
+            if n:
+                params[n] = v
+        return self._http_entry(request.request_node, request.method, request.url,
+                                headers, params)
+
     def _query_sensor(self, room_uri, sensor_type_iri):
         """Runs the parameterized sensor query."""
-        results = self.graph.query(
+        results = run_query(
+            self.graph,
             query_sensor_by_type,
-            initBindings={
+            init_bindings={
                 rdflib.Variable("room"): room_uri,
                 rdflib.Variable("SENSOR_TYPE"): sensor_type_iri
             }
         )
         return self._get_bindings(results)
 
+    def _query_by_room(self, query: str, init_bindings: dict = None) -> dict:
+        """Runs a bulk query once and groups its bindings by ?room."""
+        by_room = {}
+        results = run_query(self.graph, query, init_bindings)
+        for binding in self._get_bindings(results):
+            by_room.setdefault(binding.get("room"), []).append(binding)
+        return by_room
+
+    def _query_by_container(self, query: str, node_var: str, index: ContainmentIndex,
+                            init_bindings: dict = None) -> dict:
+        """Runs a room-free query once and groups its bindings by the rooms containing ?node_var."""
+        by_room = {}
+        results = run_query(self.graph, query, init_bindings)
+        for binding in self._get_bindings(results):
+            for room in index.containers_of(binding.get(node_var)):
+                by_room.setdefault(room, []).append(binding)
+        return by_room
+
+    def _cached_index(self, index_class, name: str):
+        """
+        Build an index from the KG once. With index_cache_dir, the index is loaded from
+        (or saved to) "<kg>_<name>_<digest>.json" in that directory, where digest is
+        the content digest of the KG, so a changed KG never reuses a stale index.
+        """
+        if name in self._indexes:
+            return self._indexes[name]
+        index_path = None
+        if self.index_cache_dir is not None:
+            kg_path = Path(self.rdf_kg_path)
+            digest = file_digest(kg_path)[:16]
+            index_path = Path(self.index_cache_dir) / f"{kg_path.stem}_{name}_{digest}.json"
+        if index_path is not None and index_path.exists():
+            print(f"Loading {name} index from: {index_path}")
+            index = index_class.load(index_path)
+        else:
+            index = index_class.from_graph(self.graph)
+            if index_path is not None:
+                os.makedirs(index_path.parent, exist_ok=True)
+                index.save(index_path)
+                print(f"{name.capitalize()} index saved to: {index_path}")
+        self._indexes[name] = index
+        return index
+
+    def containment_index(self) -> ContainmentIndex:
+        """Containment index of the KG, see _cached_index."""
+        return self._cached_index(ContainmentIndex, "containment")
+
+    def http_index(self) -> HttpRequestIndex:
+        """HTTP request index of the KG, see _cached_index."""
+        return self._cached_index(HttpRequestIndex, "http")
+
+    @staticmethod
+    def _config_entry(controller_mode: str, sensor_http, actuation_http) -> dict:
+        return {
+            "controller_function": "Ventilation",
+            "controller_mode": controller_mode,
+            "inputs": {
+                "sensor_access": sensor_http,
+            },
+            "outputs": {
+                "actuation_access": actuation_http,
+            },
+        }
+
     # ---------- main ----------
-    def generate_configuration(self):
+    def generate_configuration(self, bulk: bool = False,
+                               use_containment_index: bool = False,
+                               max_workers: int = None,
+                               stream_format: str = None,
+                               resume: bool = False):
         """
         1) Fetch rooms
         2) For each room, find ventilation devices + actuation
         3) Prefer CO2 sensors, else presence sensors, else timetable
         4) Resolve HTTP metadata for chosen sensor/actuator (GET/PUT)
         5) Emit YAML
+
+        Args:
+            bulk: Answer each query type once for all rooms and join the results in
+                Python, instead of running ~10 queries per room.
+            use_containment_index: Resolve which devices and sensors are located in
+                which room from a precomputed ContainmentIndex instead of evaluating
+                the transitive property path. Implies bulk.
+            max_workers: Number of worker processes configuring the rooms of the
+                per-room path in parallel. None or 1 runs sequentially. The output is
+                identical to the sequential path. Cannot be combined with bulk or
+                use_containment_index.
+            stream_format: Write each entry as soon as its room is configured, as YAML
+                documents ("yaml") or JSON Lines ("jsonl"), instead of a single YAML
+                list at the end.
+            resume: Only with stream_format. Continue an interrupted run after the
+                last completed room.
         """
-        configuration_list = []
-        print("Starting configuration generation...")
+        if stream_format is not None:
+            self._stream_configuration(stream_format, resume, bulk=bulk,
+                                       use_containment_index=use_containment_index,
+                                       max_workers=max_workers)
+            return
+        configuration_list = [
+            config_entry for _, config_entry in self._iter_configuration(
+                bulk=bulk, use_containment_index=use_containment_index,
+                max_workers=max_workers)
+            if config_entry is not None
+        ]
+        print(f"  {len(configuration_list)} configuration entries generated.")
+        self._save_configuration(configuration_list)
+
+    def _iter_configuration(self, bulk: bool = False, use_containment_index: bool = False,
+                            max_workers: int = None, start_after: str = None):
+        """
+        Yield (room, configuration entry) in room order. The entry is None for rooms
+        without ventilation devices.
 
-        room_results = self.graph.query(query_rooms)
-        for room_entry in room_results:
-            room_uri = room_entry["room"]
-            print(f"\n--- Processing Room: {room_uri} ---")
-
-            # 1) Devices & actuation
-            devices_results = self.graph.query(
-                query_ventilation_devices,
-                initBindings={rdflib.Variable("room"): room_uri}
-            )
-            device_bindings = self._get_bindings(devices_results)
+        Args:
+            start_after: Skip the rooms up to and including this room.
+        """
+        parallel = max_workers is not None and max_workers > 1
+        if parallel and (bulk or use_containment_index):
+            raise ValueError("max_workers only applies to the per-room path, it cannot "
+                             "be combined with bulk or use_containment_index.")
+        rooms = [room_entry["room"] for room_entry in run_query(self.graph, query_rooms)]
+        if start_after is not None:
+            room_names = [str(room) for room in rooms]
+            if start_after not in room_names:
+                raise ValueError(f"Cannot resume after {start_after}, the room is not "
+                                 f"in the KG {self.rdf_kg_path}.")
+            completed = room_names.index(start_after) + 1
+            print(f"Resuming after {start_after}, {completed} rooms already completed.")
+            rooms = rooms[completed:]
+
+        if bulk or use_containment_index:
+            return self._iter_configuration_bulk(rooms, use_containment_index)
+        if parallel:
+            return self._iter_configuration_parallel(rooms, max_workers)
+        return self._iter_configuration_per_room(rooms)
+
+    def _stream_configuration(self, stream_format: str, resume: bool, **kwargs):
+        with RecordEmitter(self.output_file, stream_format, resume=resume) as emitter:
+            for room_uri, config_entry in self._iter_configuration(
+                    start_after=emitter.last_key, **kwargs):
+                if config_entry is not None:
+                    emitter.write(config_entry)
+                emitter.checkpoint(str(room_uri))
+        print("\n--- Generation Complete ---")
+        print(f"Successfully streamed {emitter.count} configuration entries to: "
+              f"{self.output_file}")
+
+    def _iter_configuration_bulk(self, rooms: list, use_containment_index: bool = False):
+        print("Starting bulk configuration generation...")
+        co2_binding = {rdflib.Variable("SENSOR_TYPE"): self.BRICK_CO2_SENSOR}
+        presence_binding = {rdflib.Variable("SENSOR_TYPE"): self.BRICK_PRESENCE_SENSOR}
+        if use_containment_index:
+            index = self.containment_index()
+            devices_by_room = self._query_by_container(
+                query_ventilation_actuations, "actuation", index)
+            co2_by_room = self._query_by_container(
+                query_sensors_of_type, "sensor", index, co2_binding)
+            presence_by_room = self._query_by_container(
+                query_sensors_of_type, "sensor", index, presence_binding)
+        else:
+            devices_by_room = self._query_by_room(query_ventilation_devices_all_rooms)
+            co2_by_room = self._query_by_room(query_sensor_by_type_all_rooms, co2_binding)
+            presence_by_room = self._query_by_room(query_sensor_by_type_all_rooms,
+                                                   presence_binding)
+        http_index = self.http_index()
+
+        for room_uri in rooms:
+            device_bindings = devices_by_room.get(room_uri)
             if not device_bindings:
-                print("  No ventilation devices found. Skipping.")
+                yield room_uri, None
                 continue
-
             actuation_access = device_bindings[0].get("actuation_access", None)
 
-            # 2) Sensors: CO2 > presence > timetable
+            # Sensors: CO2 > presence > timetable
             sensor_access = None
             controller_mode = "timetable"
-
-            co2_bindings = self._query_sensor(room_uri, self.BRICK_CO2_SENSOR)
-            if co2_bindings:
-                sensor_access = co2_bindings[0].get("sensor_access", None)
+            if co2_by_room.get(room_uri):
+                sensor_access = co2_by_room[room_uri][0].get("sensor_access", None)
                 controller_mode = "co2"
-                print("  Found CO2 sensor.")
+            elif presence_by_room.get(room_uri):
+                sensor_access = presence_by_room[room_uri][0].get("sensor_access", None)
+                controller_mode = "presence"
+
+            sensor_http = self._resolve_http_from_index(
+                http_index, sensor_access, "GET") if sensor_access else None
+            actuation_http = self._resolve_http_from_index(
+                http_index, actuation_access, ["PUT", "POST", "PATCH"]
+            ) if actuation_access else None
+            yield room_uri, self._config_entry(controller_mode, sensor_http, actuation_http)
+
+    def _iter_configuration_per_room(self, rooms: list):
+        print("Starting configuration generation...")
+        for room_uri in rooms:
+            yield room_uri, self._configure_room(room_uri)
+
+    def _iter_configuration_parallel(self, rooms: list, max_workers: int):
+        """
+        Partition the rooms into contiguous chunks that are configured by a process
+        pool, the chunks are joined in room order. The workers do not parse the
+        original KG again:
+            - a SQLite store is opened read-only by each worker,
+            - forked workers inherit the graph of this process (copy-on-write),
+            - otherwise the graph is passed as N-Triples snapshot, which is faster to
+              load than Turtle.
+        """
+        print(f"Starting parallel configuration generation for {len(rooms)} rooms "
+              f"with {max_workers} workers...")
+        # a few chunks per worker to balance rooms with different numbers of devices
+        chunk_size = max(1, -(-len(rooms) // (max_workers * 4)))
+        chunks = [rooms[i:i + chunk_size] for i in range(0, len(rooms), chunk_size)]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if is_kg_store(self.rdf_kg_path):
+                snapshot = self.rdf_kg_path
+            elif multiprocessing.get_start_method() == "fork":
+                snapshot = None
+                _configuration_worker_state["configuration"] = self
             else:
-                presence_bindings = self._query_sensor(room_uri, self.BRICK_PRESENCE_SENSOR)
-                if presence_bindings:
-                    sensor_access = presence_bindings[0].get("sensor_access", None)
-                    controller_mode = "presence"
-                    print("  Found Presence sensor.")
-                else:
-                    print("  No CO2 or Presence sensor found. Defaulting to timetable.")
-
-            # 3) Resolve HTTP metadata from KG (GET for sensors, PUT for actuators)
-            sensor_http = self._resolve_http_by_method(sensor_access, "GET") if sensor_access else None
-            actuation_http = self._resolve_http_by_method(actuation_access,
-                                                          ["PUT", "POST", "PATCH"]
-                                                          ) if actuation_access else None
-
-            # 4) Assemble config entry
-            config_entry = {
-                "controller_function": "Ventilation",
-                "controller_mode": controller_mode,
-                "inputs": {
-                    "sensor_access": sensor_http,
-                },
-                "outputs": {
-                    "actuation_access": actuation_http,
-                },
-            }
+                snapshot = str(Path(tmp_dir) / "snapshot.nt")
+                self.graph.serialize(snapshot, format="nt")
+            try:
+                with ProcessPoolExecutor(max_workers=max_workers,
+                                         initializer=_init_configuration_worker,
+                                         initargs=(snapshot,)) as executor:
+                    for chunk, chunk_entries in zip(
+                            chunks, executor.map(_configure_rooms_worker, chunks)):
+                        yield from zip(chunk, chunk_entries)
+            finally:
+                _configuration_worker_state.pop("configuration", None)
+
+    def _configure_room(self, room_uri, verbose: bool = True) -> Union[dict, None]:
+        """Configuration entry of a room, or None if it has no ventilation devices."""
+        log = print if verbose else (lambda *args: None)
+        log(f"\n--- Processing Room: {room_uri} ---")
+
+        # 1) Devices & actuation
+        devices_results = run_query(
+            self.graph,
+            query_ventilation_devices,
+            init_bindings={rdflib.Variable("room"): room_uri}
+        )
+        device_bindings = self._get_bindings(devices_results)
+        if not device_bindings:
+            log("  No ventilation devices found. Skipping.")
+            return None
+
+        actuation_access = device_bindings[0].get("actuation_access", None)
+
+        # 2) Sensors: CO2 > presence > timetable
+        sensor_access = None
+        controller_mode = "timetable"
+
+        co2_bindings = self._query_sensor(room_uri, self.BRICK_CO2_SENSOR)
+        if co2_bindings:
+            sensor_access = co2_bindings[0].get("sensor_access", None)
+            controller_mode = "co2"
+            log("  Found CO2 sensor.")
+        else:
+            presence_bindings = self._query_sensor(room_uri, self.BRICK_PRESENCE_SENSOR)
+            if presence_bindings:
+                sensor_access = presence_bindings[0].get("sensor_access", None)
+                controller_mode = "presence"
+                log("  Found Presence sensor.")
+            else:
+                log("  No CO2 or Presence sensor found. Defaulting to timetable.")
+
+        # 3) Resolve HTTP metadata from KG (GET for sensors, PUT for actuators)
+        sensor_http = self._resolve_http_by_method(sensor_access, "GET") if sensor_access else None
+        actuation_http = self._resolve_http_by_method(actuation_access,
+                                                      ["PUT", "POST", "PATCH"]
+                                                      ) if actuation_access else None
 
-            configuration_list.append(config_entry)
-            print("  Configuration entry generated.")
+        # 4) Assemble config entry
+        config_entry = self._config_entry(controller_mode, sensor_http, actuation_http)
+        log("  Configuration entry generated.")
+        return config_entry
 
+    def _save_configuration(self, configuration_list: list):
         # 5) Save all configs
         print("\n--- Generation Complete ---")
         out_path = Path(self.output_file)
@@ -269,10 +587,27 @@ class ControllerConfiguration:
             os.makedirs(out_dir, exist_ok=True)
 
         with open(out_path, "w") as f:
-            yaml.safe_dump(configuration_list, f, sort_keys=False)
+            yaml.dump(configuration_list, f, Dumper=SafeDumper, sort_keys=False)
         print(f"Successfully saved configuration to: {out_path}")
 
 
+# state of the worker processes of ControllerConfiguration._iter_configuration_parallel
+_configuration_worker_state = {}
+
+
+def _init_configuration_worker(snapshot: Union[str, None]):
+    # without snapshot, the configuration was inherited from the parent process
+    if snapshot is not None:
+        _configuration_worker_state["configuration"] = ControllerConfiguration(
+            rdf_kg_path=snapshot, output_file=None)
+
+
+def _configure_rooms_worker(room_uris: list) -> list:
+    configuration = _configuration_worker_state["configuration"]
+    return [configuration._configure_room(room_uri, verbose=False)
+            for room_uri in room_uris]
+
+
 # --- CLI ----------------------------------------------------------------------
 
 if __name__ == "__main__":
@@ -288,4 +623,4 @@ if __name__ == "__main__":
         rdf_kg_path=str(rdf_kg_path),
         output_file=str(output_file),
     )
-    configuration.generate_configuration()
\ No newline at end of file
+    configuration.generate_configuration(use_containment_index=True)
\ No newline at end of file
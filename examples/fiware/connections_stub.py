@@ -0,0 +1,60 @@
+"""
+Validate the bulk provisioning of devices and subscriptions
+(datamodels.bulk_connections) against a local stand-in for Orion and the IoT Agent.
+The sensors and actuators of a hotel are taken from the exported dataset. The
+provisioning is run twice, the second run must not register anything again.
+"""
+import json
+import time
+from pathlib import Path
+from examples.fiware.datamodels.bulk_connections import BulkConnectionProvisioner, \
+    connection_plan
+from examples.fiware.stub_orion import StubOrion
+
+project_root_path = Path(__file__).parent
+HOTEL = 'fiware_entities_1000rooms'
+FIWARE_SERVICE = 'fiware_demo'
+FIWARE_SERVICE_PATH = '/'
+INTERNAL_MQTT_URL = "mqtt://mosquitto:1883"
+QL_URL = "http://quantumleap:8668/v2/notify"
+APIKEY = "hotel"
+
+
+def sensors_and_actuators(entities: list):
+    """(id, type, attributes) of sensors and (id, location, commands) of actuators."""
+    sensors, actuators = [], []
+    for entity in entities:
+        attrs = [key for key, attr in entity.items()
+                 if key not in ("id", "type", "hasLocation", "isPartOf")
+                 and attr["type"] == "Number"]
+        location = entity.get("hasLocation", {}).get("value")
+        if entity["type"].endswith("Sensor"):
+            sensors.append((entity["id"], entity["type"], attrs))
+        elif entity["type"] in ("FreshAirVentilation", "RadiatorThermostat", "CoolingCoil"):
+            actuators.append((entity["id"], location, attrs))
+    return sensors, actuators
+
+
+if __name__ == '__main__':
+    with open(project_root_path / "hotel_dataset" / f"{HOTEL}.json", "r") as f:
+        entities = json.load(f)
+    sensors, actuators = sensors_and_actuators(entities)
+    plan = connection_plan(sensors, actuators, internal_mqtt_url=INTERNAL_MQTT_URL,
+                           ql_url=QL_URL, apikey=APIKEY)
+    print(f"{len(plan.devices)} devices and {len(plan.subscriptions)} subscriptions planned")
+
+    orion = StubOrion()
+    for run in ("first", "second"):
+        orion.request_counts.clear()
+        start_time = time.perf_counter()
+        with BulkConnectionProvisioner(cb_url=orion.url, iota_url=orion.url,
+                                       fiware_service=FIWARE_SERVICE,
+                                       fiware_service_path=FIWARE_SERVICE_PATH) as provisioner:
+            provisioner.provision(plan)
+        print(f"{run} run: {time.perf_counter() - start_time:.3f} s, "
+              f"{sum(orion.request_counts.values())} requests {dict(orion.request_counts)}")
+
+    registered = {kind: len(orion.registrations(kind, FIWARE_SERVICE, FIWARE_SERVICE_PATH))
+                  for kind in ("devices", "subscriptions", "services")}
+    print(f"Registered: {registered}")
+    orion.shutdown()
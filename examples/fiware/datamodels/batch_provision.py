@@ -0,0 +1,136 @@
+"""
+Batched provisioning of entities to the Orion Context Broker (NGSI-v2).
+
+hotel_provision.add_relationships reads every entity, and every attribute value, back
+from Orion to find the relationships, and then updates them one by one. Here the
+relationships are detected locally, against the ids of the entities being created
+(and optionally ids that already exist in Orion), so the entities are sent once, in
+the normalized format with the type "Relationship" already set, in chunks of
+/v2/op/update requests that are sent concurrently.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
+import requests
+from semantic_iot.utils.ngsi_source import pooled_session
+
+# Orion accepts batches of up to 1 MB, about 1000 small entities
+DEFAULT_CHUNK_SIZE = 100
+
+# Orion infers the attribute type of keyValues entities from the JSON value
+KEY_VALUES_TYPES = ((bool, "Boolean"), ((int, float), "Number"), (str, "Text"),
+                    ((dict, list), "StructuredValue"))
+
+
+def attribute_type(value) -> str:
+    """Attribute type that Orion assigns to a keyValues attribute."""
+    if value is None:
+        return "None"
+    for python_types, ngsi_type in KEY_VALUES_TYPES:
+        if isinstance(value, python_types):
+            return ngsi_type
+    return "StructuredValue"
+
+
+def _key_values(entity) -> dict:
+    # pydantic models (ContextEntityKeyValues) or dicts
+    return entity.model_dump() if hasattr(entity, "model_dump") else dict(entity)
+
+
+def resolve_relationships(entities: Iterable,
+                          known_ids: Iterable[str] = ()) -> List[dict]:
+    """
+    Convert keyValues entities (e.g. the pydantic models of hotel_provision) to
+    normalized entities. A text attribute whose value is the id of one of the entities,
+    or one of known_ids, gets the type "Relationship", the other attribute types are
+    the ones Orion infers for keyValues.
+    """
+    entities = [_key_values(entity) for entity in entities]
+    entity_ids = {entity["id"] for entity in entities} | set(known_ids)
+    normalized = []
+    for entity in entities:
+        normalized_entity = {"id": entity["id"], "type": entity["type"]}
+        for key, value in entity.items():
+            if key in ("id", "type"):
+                continue
+            if isinstance(value, str) and value in entity_ids:
+                normalized_entity[key] = {"type": "Relationship", "value": value}
+            else:
+                normalized_entity[key] = {"type": attribute_type(value), "value": value}
+        normalized.append(normalized_entity)
+    return normalized
+
+
+def post_batch_update(entities: List[dict],
+                      cb_url: str,
+                      fiware_service: str = None,
+                      fiware_service_path: str = "/",
+                      action_type: str = "append",
+                      chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      max_workers: int = 4,
+                      session: requests.Session = None,
+                      timeout: float = 30) -> int:
+    """
+    Send normalized entities to /v2/op/update in chunks of chunk_size entities, with
+    up to max_workers requests at the same time over one pooled session.
+
+    Returns:
+        Number of sent batches.
+    """
+    url = cb_url.rstrip("/") + "/v2/op/update"
+    headers = {"Fiware-ServicePath": fiware_service_path}
+    if fiware_service:
+        headers["Fiware-Service"] = fiware_service
+    chunks = [entities[i:i + chunk_size] for i in range(0, len(entities), chunk_size)]
+    own_session = session is None
+    # an append of the same entities is idempotent, so it is safe to retry
+    session = session or pooled_session(max_workers, allowed_methods=("POST",))
+
+    def post(chunk):
+        response = session.post(url, json={"actionType": action_type, "entities": chunk},
+                                headers=headers, timeout=timeout)
+        response.raise_for_status()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for future in [executor.submit(post, chunk) for chunk in chunks]:
+                future.result()
+    finally:
+        if own_session:
+            session.close()
+    return len(chunks)
+
+
+def provision_entities(entities: Iterable,
+                       cb_url: str,
+                       fiware_service: str = None,
+                       fiware_service_path: str = "/",
+                       known_ids: Iterable[str] = (),
+                       chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       max_workers: int = 4,
+                       session: requests.Session = None) -> List[dict]:
+    """
+    Create (or update) the entities with their relationships in Orion, replacing the
+    posting of keyValues entities followed by add_relationships.
+
+    Args:
+        entities: keyValues entities, e.g. of initialize_room_entities for all rooms.
+        cb_url: URL of the Orion Context Broker.
+        fiware_service: Fiware-Service header.
+        fiware_service_path: Fiware-ServicePath header.
+        known_ids: Ids of entities that already exist in Orion and may be referenced.
+        chunk_size: Number of entities per /v2/op/update request.
+        max_workers: Number of concurrent requests.
+        session: Session to reuse, by default a pooled session is created.
+
+    Returns:
+        The normalized entities that were sent.
+    """
+    normalized = resolve_relationships(entities, known_ids)
+    batches = post_batch_update(normalized, cb_url, fiware_service, fiware_service_path,
+                                chunk_size=chunk_size, max_workers=max_workers,
+                                session=session)
+    num_relationships = sum(1 for entity in normalized for attr in entity.values()
+                            if isinstance(attr, dict) and attr["type"] == "Relationship")
+    print(f"Successfully provisioned {len(normalized)} entities with "
+          f"{num_relationships} relationships in {batches} batches")
+    return normalized
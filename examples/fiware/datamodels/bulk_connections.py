@@ -0,0 +1,266 @@
+"""
+Bulk provisioning of the IoT Agent devices and the Orion subscriptions of a hotel.
+
+hotel_provision.create_connections builds one filip Device or Subscription per sensor,
+command and attribute and registers each of them with its own request. Here all
+devices and subscriptions of a hotel are computed in one pass as plain payloads
+(ConnectionPlan) and registered in bulk:
+    - devices with the multi-device POST /iot/devices of the IoT Agent, in chunks,
+    - subscriptions with POST /v2/subscriptions, concurrently with bounded parallelism.
+The registration is idempotent: the existing devices, subscriptions and service group
+are read first, and only missing or changed registrations are sent, so provisioning
+can be repeated after a partial failure.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, NamedTuple, Tuple
+import requests
+from semantic_iot.utils.ngsi_source import pooled_session
+
+DEFAULT_CHUNK_SIZE = 100
+
+# Page size when reading existing registrations
+PAGE_LIMIT = 1000
+
+
+class ConnectionPlan(NamedTuple):
+    """All registrations of a hotel, as JSON payloads."""
+    devices: List[dict]
+    subscriptions: List[dict]
+    service_group: dict = None
+
+
+def sensor_device(entity_id: str, entity_type: str, attributes: Iterable[str]) -> dict:
+    """IoT Agent device of a sensor entity, see initialize_sensor_connection."""
+    return {
+        "device_id": entity_id,
+        "entity_name": entity_id,
+        "entity_type": entity_type,
+        "transport": "MQTT",
+        "attributes": [{"name": key, "type": "Number"} for key in attributes],
+        "explicitAttrs": True,
+    }
+
+
+def command_subscription(entity_id: str, command: str, location: str,
+                         mqtt_url: str) -> dict:
+    """MQTT notification of an actuator command, see initialize_actuator_connection."""
+    return {
+        "description": "MQTT Command notification",
+        "subject": {"entities": [{"id": entity_id}],
+                    "condition": {"attrs": [command]}},
+        "notification": {"attrs": [command],
+                         "mqttCustom": {"url": mqtt_url,
+                                        "topic": f"{location}/{entity_id}/{command}",
+                                        "payload": "${" + command + "}"}},
+        "throttling": 0,
+    }
+
+
+def timeseries_subscription(entity_id: str, attribute: str, ql_url: str) -> dict:
+    """Notification of QuantumLeap, see initialize_timeseries_notification."""
+    return {
+        "description": "Time Series notification",
+        "subject": {"entities": [{"id": entity_id}],
+                    "condition": {"attrs": [attribute]}},
+        "notification": {"attrs": [attribute], "http": {"url": ql_url}},
+        "throttling": 0,
+    }
+
+
+def service_group(apikey: str, resource: str = "/iot/json") -> dict:
+    return {
+        "resource": resource,
+        "apikey": apikey,
+        "autoprovision": False,
+        "explicitAttrs": True,
+        "ngsiVersion": "v2",
+    }
+
+
+def connection_plan(sensors: Iterable[Tuple[str, str, List[str]]],
+                    actuators: Iterable[Tuple[str, str, List[str]]],
+                    internal_mqtt_url: str,
+                    ql_url: str,
+                    apikey: str = None) -> ConnectionPlan:
+    """
+    Compute all registrations of a hotel in one pass.
+
+    Args:
+        sensors: (entity id, entity type, attribute names) of each sensor.
+        actuators: (entity id, location, command names) of each actuator. The location
+            (hasLocation or isPartOf, "None" if neither) is part of the MQTT topic.
+        internal_mqtt_url: MQTT broker URL as seen from Orion.
+        ql_url: QuantumLeap notification URL as seen from Orion.
+        apikey: API key of the service group of the devices.
+    """
+    devices, subscriptions = [], []
+    for entity_id, entity_type, attributes in sensors:
+        devices.append(sensor_device(entity_id, entity_type, attributes))
+        subscriptions.extend(timeseries_subscription(entity_id, key, ql_url)
+                             for key in attributes)
+    for entity_id, location, commands in actuators:
+        subscriptions.extend(command_subscription(entity_id, key, location or "None",
+                                                  internal_mqtt_url)
+                             for key in commands)
+        subscriptions.extend(timeseries_subscription(entity_id, key, ql_url)
+                             for key in commands)
+    group = service_group(apikey) if devices and apikey else None
+    return ConnectionPlan(devices, subscriptions, group)
+
+
+def device_key(device: dict) -> str:
+    """The fields of a device that are compared with the registered device."""
+    return json.dumps([device.get("entity_name"), device.get("entity_type"),
+                       sorted((a["name"], a.get("type")) for a in device.get("attributes", []))])
+
+
+def subscription_key(subscription: dict) -> str:
+    """
+    The fields of a subscription that identify it, without the fields Orion adds
+    (id, status, timesSent, ...).
+    """
+    subject = subscription.get("subject", {})
+    notification = subscription.get("notification", {})
+    endpoint = notification.get("http") or notification.get("mqttCustom") or \
+        notification.get("mqtt") or {}
+    return json.dumps([
+        subscription.get("description"),
+        sorted(e.get("id") or e.get("idPattern") for e in subject.get("entities", [])),
+        sorted(subject.get("condition", {}).get("attrs", [])),
+        sorted(notification.get("attrs", [])),
+        {key: endpoint.get(key) for key in ("url", "topic", "payload")},
+    ])
+
+
+class BulkConnectionProvisioner:
+    def __init__(self,
+                 cb_url: str,
+                 iota_url: str,
+                 fiware_service: str = None,
+                 fiware_service_path: str = "/",
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_workers: int = 8,
+                 session: requests.Session = None,
+                 timeout: float = 30):
+        """
+        Register a ConnectionPlan at Orion and the IoT Agent.
+
+        Args:
+            cb_url: URL of the Orion Context Broker, e.g. "http://localhost:1026".
+            iota_url: URL of the north port of the IoT Agent, e.g. "http://localhost:4041".
+            fiware_service: Fiware-Service header.
+            fiware_service_path: Fiware-ServicePath header.
+            chunk_size: Number of devices per multi-device POST.
+            max_workers: Maximum number of requests at the same time.
+            session: Session to reuse, by default a pooled session is created.
+            timeout: Timeout of each request in seconds.
+        """
+        self.cb_url = cb_url.rstrip("/")
+        self.iota_url = iota_url.rstrip("/")
+        self.headers = {"Fiware-ServicePath": fiware_service_path}
+        if fiware_service:
+            self.headers["Fiware-Service"] = fiware_service
+        self.chunk_size = chunk_size
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.session = session or pooled_session(self.max_workers)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        response = self.session.request(method, url, headers=self.headers,
+                                        timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def _run_concurrently(self, function, items: list):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for future in [executor.submit(function, item) for item in items]:
+                future.result()
+
+    # ---------- existing registrations ----------
+    def existing_devices(self) -> dict:
+        """{device_id: device} of the devices registered at the IoT Agent."""
+        devices, offset = {}, 0
+        while True:
+            page = self._request("GET", f"{self.iota_url}/iot/devices",
+                                 params={"limit": PAGE_LIMIT, "offset": offset}).json()
+            devices.update((d["device_id"], d) for d in page.get("devices", []))
+            offset += PAGE_LIMIT
+            if offset >= page.get("count", 0):
+                return devices
+
+    def existing_subscriptions(self) -> set:
+        """Keys (see subscription_key) of the subscriptions registered at Orion."""
+        keys, offset = set(), 0
+        while True:
+            response = self._request("GET", f"{self.cb_url}/v2/subscriptions",
+                                     params={"limit": PAGE_LIMIT, "offset": offset,
+                                             "options": "count"})
+            keys.update(subscription_key(s) for s in response.json())
+            offset += PAGE_LIMIT
+            if offset >= int(response.headers.get("Fiware-Total-Count", 0)):
+                return keys
+
+    # ---------- registration ----------
+    def register_devices(self, devices: List[dict]) -> dict:
+        """Create missing devices in chunks and update changed ones."""
+        existing = self.existing_devices()
+        new = [d for d in devices if d["device_id"] not in existing]
+        changed = [d for d in devices if d["device_id"] in existing and
+                   device_key(d) != device_key(existing[d["device_id"]])]
+        chunks = [new[i:i + self.chunk_size] for i in range(0, len(new), self.chunk_size)]
+        self._run_concurrently(
+            lambda chunk: self._request("POST", f"{self.iota_url}/iot/devices",
+                                        json={"devices": chunk}), chunks)
+        self._run_concurrently(
+            lambda device: self._request(
+                "PUT", f"{self.iota_url}/iot/devices/{device['device_id']}",
+                json={key: device[key] for key in
+                      ("entity_name", "entity_type", "attributes")}), changed)
+        return {"created": len(new), "updated": len(changed),
+                "unchanged": len(devices) - len(new) - len(changed)}
+
+    def register_subscriptions(self, subscriptions: List[dict]) -> dict:
+        """Create the subscriptions that do not exist yet."""
+        existing = self.existing_subscriptions()
+        missing, planned = [], set()
+        for subscription in subscriptions:
+            key = subscription_key(subscription)
+            if key not in existing and key not in planned:
+                planned.add(key)
+                missing.append(subscription)
+        self._run_concurrently(
+            lambda subscription: self._request("POST", f"{self.cb_url}/v2/subscriptions",
+                                               json=subscription), missing)
+        return {"created": len(missing), "unchanged": len(subscriptions) - len(missing)}
+
+    def register_service_group(self, group: dict) -> bool:
+        """Create the service group if no group with its resource and API key exists."""
+        response = self._request("GET", f"{self.iota_url}/iot/services",
+                                 params={"resource": group["resource"],
+                                         "apikey": group["apikey"]})
+        if any(s.get("apikey") == group["apikey"] for s in response.json().get("services", [])):
+            print(f"ServiceGroup with API key '{group['apikey']}' already exists, "
+                  f"skipping creation.")
+            return False
+        self._request("POST", f"{self.iota_url}/iot/services", json={"services": [group]})
+        return True
+
+    def provision(self, plan: ConnectionPlan) -> dict:
+        """Register the service group, devices and subscriptions of the plan."""
+        summary = {}
+        if plan.service_group is not None:
+            summary["service_group"] = self.register_service_group(plan.service_group)
+        summary["devices"] = self.register_devices(plan.devices)
+        summary["subscriptions"] = self.register_subscriptions(plan.subscriptions)
+        print(f"Devices: {summary['devices']}, subscriptions: {summary['subscriptions']}")
+        return summary
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -10,6 +10,8 @@ from examples.fiware.datamodels.pydantic_models import HotelRoomFiware, \
     CO2SensorFiware, PresenceSensorFiware, FreshAirVentilationFiware, \
     RadiatorThermostatFiware, CoolingCoilFiware, SensorFiware, ActuatorFiware, \
     HotelFiware, TemperatureSensorAmbFiware
+from examples.fiware.datamodels.bulk_connections import BulkConnectionProvisioner, \
+    ConnectionPlan, connection_plan
 import os
 import json
 from filip.clients.ngsi_v2.cb import ContextBrokerClient
@@ -180,6 +182,8 @@ def initialize_timeseries_notification(entity: Union[SensorFiware, ActuatorFiwar
 
 def add_relationships(entities: List[ContextEntityKeyValues],
                       cb_client: ContextBrokerClient):
+    # For many entities, use batch_provision.provision_entities instead, which
+    # resolves the relationships locally and sends the entities in batches
     # go through all entities and their attributes
     # try to check the attribute value as an entity id
     # if the attribute value is an entity id, assign this attribute as relationship
@@ -219,6 +223,7 @@ def create_connections(entities: List[ContextEntityKeyValues],
                        apikey: str,
                        ql_url: str
                        ):
+    # registers each device and subscription on its own, see create_connections_bulk
     any_device = False
     for entity in entities:
         if isinstance(entity, SensorFiware):
@@ -267,6 +272,49 @@ def create_connections(entities: List[ContextEntityKeyValues],
             }))
 
 
+
+def plan_connections(entities: List[ContextEntityKeyValues],
+                     internal_mqtt_url: str,
+                     ql_url: str,
+                     apikey: str = None) -> ConnectionPlan:
+    """
+    Compute the devices and subscriptions of create_connections for all entities in
+    one pass, as payloads for BulkConnectionProvisioner.
+    """
+    sensors, actuators = [], []
+    for entity in entities:
+        if isinstance(entity, SensorFiware):
+            sensors.append((entity.id, entity.type, list(entity.get_sensor_attribute())))
+        elif isinstance(entity, ActuatorFiware):
+            location = getattr(entity, "hasLocation", None) or \
+                getattr(entity, "isPartOf", None)
+            actuators.append((entity.id, location, list(entity.get_actuator_attribute())))
+    return connection_plan(sensors, actuators, internal_mqtt_url=internal_mqtt_url,
+                           ql_url=ql_url, apikey=apikey)
+
+
+def create_connections_bulk(entities: List[ContextEntityKeyValues],
+                            cb_url: str,
+                            iota_url: str,
+                            fiware_header: FiwareHeader,
+                            internal_mqtt_url: str,
+                            apikey: str,
+                            ql_url: str,
+                            max_workers: int = 8) -> dict:
+    """
+    Bulk and idempotent variant of create_connections: the devices are registered
+    with multi-device requests, the subscriptions concurrently, and registrations
+    that already exist are skipped.
+    """
+    plan = plan_connections(entities, internal_mqtt_url=internal_mqtt_url,
+                            ql_url=ql_url, apikey=apikey)
+    with BulkConnectionProvisioner(cb_url=cb_url, iota_url=iota_url,
+                                   fiware_service=fiware_header.service,
+                                   fiware_service_path=fiware_header.service_path,
+                                   max_workers=max_workers) as provisioner:
+        return provisioner.provision(plan)
+
+
 if __name__ == '__main__':
     """
     Create the example dataset to set up the KG construction pipeline for FIWARE
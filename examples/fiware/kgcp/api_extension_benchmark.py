@@ -0,0 +1,62 @@
+"""
+Benchmark the HTTP extension of the KGCP (APIPostprocessor.extend_kg) with the FIWARE
+OpenAPI spec. Report the cost per rdf:value URI and compare the size and the
+serialization time of the extended KG with and without shared parameter nodes.
+"""
+import tempfile
+import time
+from pathlib import Path
+from semantic_iot import APIPostprocessor
+
+project_root = Path(__file__).parent.parent
+OPENAPI = Path(__file__).parent / 'api_spec.json'
+HOTEL = 'fiware_entities_1000rooms'
+repeat = 5
+
+
+def measure_extend_kg(kg_path: Path, api_spec_path: Path, repetitions: int = 5,
+                      share_parameters: bool = False):
+    """
+    Measure the elapsed time of extend_kg and serialize. Parsing the KG and the spec
+    is excluded, since a fresh postprocessor is needed for every repetition.
+    """
+    extend_timings = []
+    serialize_timings = []
+    num_uris = 0
+    num_triples = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for _ in range(repetitions):
+            postprocessor = APIPostprocessor(
+                kg_path=kg_path,
+                api_spec_path=api_spec_path
+            )
+            num_uris = len(postprocessor._gather_value_uris())
+
+            start_time = time.perf_counter()
+            postprocessor.extend_kg(share_parameters=share_parameters)
+            extend_timings.append(time.perf_counter() - start_time)
+            num_triples = len(postprocessor.kg)
+
+            start_time = time.perf_counter()
+            postprocessor.serialize(Path(tmp_dir) / f'{kg_path.stem}_extended.ttl')
+            serialize_timings.append(time.perf_counter() - start_time)
+    return extend_timings, serialize_timings, num_uris, num_triples
+
+
+if __name__ == '__main__':
+    kg_path = project_root / f'kgcp/results/brick/{HOTEL}.ttl'
+
+    for share_parameters in (False, True):
+        extend_timings, serialize_timings, num_uris, num_triples = measure_extend_kg(
+            kg_path, OPENAPI, repetitions=repeat, share_parameters=share_parameters)
+
+        average = sum(extend_timings) / len(extend_timings)
+        print(f"extend_kg for {HOTEL} ({num_uris} URIs, "
+              f"share_parameters={share_parameters})")
+        print(f"Average: {average:.3f} s")
+        print(f"Min: {min(extend_timings):.3f} s")
+        print(f"Max: {max(extend_timings):.3f} s")
+        print(f"Per URI: {average / num_uris * 1e6:.1f} us")
+        print(f"Triples in extended KG: {num_triples}")
+        print(f"Serialize average: "
+              f"{sum(serialize_timings) / len(serialize_timings):.3f} s\n")
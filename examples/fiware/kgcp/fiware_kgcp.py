@@ -2,7 +2,7 @@ import json
 import time
 from pathlib import Path
 from memory_profiler import memory_usage
-from semantic_iot import RDFGenerator, APIPostprocessor
+from semantic_iot import RDFGenerator, APIBatchPostprocessor
 
 # Path to OpenAPI spec (adjust as needed)
 OPENAPI   = Path(__file__).parent / 'api_spec.json'
@@ -44,6 +44,8 @@ if __name__ == '__main__':
     mapping_file = project_root / 'kgcp/rml/brick/fiware_hotel_rml.ttl'
     config_file  = project_root / 'kgcp/rml/fiware_config.json'
     metrics = dict()
+    kg_paths = []
+    output_paths = []
 
     rdf_gen = RDFGenerator(
         mapping_file=str(mapping_file),
@@ -93,14 +95,12 @@ if __name__ == '__main__':
                 engine='morph-kgc'
             )
         out_ext = project_root / f'kgcp/results/{hotel}_extended.ttl'
+        kg_paths.append(dst)
+        output_paths.append(out_ext)
 
-        postprocessor = APIPostprocessor(
-            kg_path=dst,
-            api_spec_path=OPENAPI
-        )
-        postprocessor.extend_kg()
-        postprocessor.kg.serialize(destination=str(out_ext), format='turtle')
-
+    # Extend all hotels at once, the OpenAPI spec is only parsed and prepared once
+    postprocessor = APIBatchPostprocessor(api_spec_path=OPENAPI)
+    postprocessor.extend_kgs(kg_paths, output_paths)
 
     # Save metrics as JSON file
     time_stamp = time.strftime("%Y_%m_%d-%H_%M_%S")  # current timestamp
@@ -0,0 +1,68 @@
+"""
+Generate the KG of a hotel directly from an NGSI-v2 context broker with NGSIv2Source,
+without exporting the entities to a JSON file first. A local stub of Orion serves the
+entities of a hotel dataset with limit/offset paging, so no FIWARE deployment is
+needed. Replace the stub URL with the Orion URL to ingest from a real platform.
+The KG is checked against the KG generated from the JSON file.
+"""
+import json
+import tempfile
+import time
+from pathlib import Path
+import rdflib
+from semantic_iot import RDFGenerator, RMLMappingGenerator
+from semantic_iot.utils.ngsi_source import NGSIv2Source
+from examples.fiware.stub_orion import StubOrion
+
+project_root = Path(__file__).parent.parent
+REPORT = project_root / 'kgcp/rml/brick/intermediate_report_validated_brick.json'
+CONFIG = project_root / 'kgcp/rml/fiware_config.json'
+HOTEL = 'fiware_entities_100rooms'
+FIWARE_SERVICE = 'fiware_demo'
+FIWARE_SERVICE_PATH = '/'
+
+
+if __name__ == '__main__':
+    src = project_root / f'hotel_dataset/{HOTEL}.json'
+    with open(src, 'r') as f:
+        entities = json.load(f)
+    orion = StubOrion(entities, service=FIWARE_SERVICE, service_path=FIWARE_SERVICE_PATH)
+    cb_url = orion.url
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mapping_file = Path(tmp_dir) / "rml.ttl"
+        rml_generator = RMLMappingGenerator(
+            rdf_relationship_file=str(REPORT),
+            output_file=str(mapping_file),
+            partition_sources=True
+        )
+        rml_generator.load_intermediate_reports()
+        rml_generator.create_mapping_file()
+        rdf_gen = RDFGenerator(
+            mapping_file=str(mapping_file),
+            platform_config=str(CONFIG),
+            partition_sources=True
+        )
+
+        # Reference: KG generated from the exported JSON file
+        file_kg = Path(tmp_dir) / "file.ttl"
+        rdf_gen.generate_rdf(source_file=str(src), destination_file=str(file_kg))
+
+        # KG generated from the entities streamed from the (stub) context broker
+        stream_kg = Path(tmp_dir) / "stream.ttl"
+        start_time = time.perf_counter()
+        with NGSIv2Source(cb_url, service=FIWARE_SERVICE,
+                          service_path=FIWARE_SERVICE_PATH,
+                          limit=100, max_workers=4) as source:
+            rdf_gen.generate_rdf_from_entities(source.iter_entities(),
+                                               destination_file=str(stream_kg))
+            print(f"{source.total_count} entities read from {cb_url} and mapped in "
+                  f"{time.perf_counter() - start_time:.3f} s")
+
+        # Another tenant has no entities
+        with NGSIv2Source(cb_url, service="other_service") as source:
+            print(f"Entities of other_service: {len(list(source.iter_entities()))}")
+
+        same = set(rdflib.Graph().parse(stream_kg)) == set(rdflib.Graph().parse(file_kg))
+        print(f"Same KG as from {src.name}: {same}")
+    orion.shutdown()
@@ -0,0 +1,13 @@
+from semantic_iot import RMLBatchGenerator
+from pathlib import Path
+project_root_path = Path(__file__).parent.parent
+# Manifest with the validated intermediate reports of all ontologies
+MANIFEST_FILE_PATH = project_root_path / "kgcp" / "rml" / "manifest.json"
+
+if __name__ == '__main__':
+    # Initialize RMLBatchGenerator class
+    rml_batch_generator = RMLBatchGenerator(manifest=MANIFEST_FILE_PATH)
+
+    # Generate all mapping files, outputs with unchanged inputs are skipped
+    generated = rml_batch_generator.generate(max_workers=3)
+    print(f"{len(generated)} RML Mapping files generated")
@@ -0,0 +1,77 @@
+"""
+Benchmark the materialization of the KGCP with join-free object maps
+(RMLMappingGenerator(join_free=True)) against the default joins of the relationships.
+Each variant is checked against the KG generated with joins.
+"""
+import tempfile
+import time
+from pathlib import Path
+import rdflib
+from semantic_iot import RMLMappingGenerator, RDFGenerator
+
+project_root = Path(__file__).parent.parent
+REPORT = project_root / 'kgcp/rml/brick/intermediate_report_validated_brick.json'
+CONFIG = project_root / 'kgcp/rml/fiware_config.json'
+HOTEL = 'fiware_entities_1000rooms'
+repeat = 3
+
+# (name, RMLMappingGenerator options, RDFGenerator options)
+VARIANTS = [
+    ('joins', {}, {}),
+    ('join-free', {'join_free': True}, {'check_references': True}),
+    ('join-free, per-type sources', {'join_free': True, 'partition_sources': True},
+     {'check_references': True, 'partition_sources': True}),
+]
+
+
+def measure_generate_rdf(mapping_file: Path, source_file: Path, destination_file: Path,
+                         repetitions: int = 3, **kwargs):
+    """
+    Measure the elapsed time of generate_rdf, including the preprocessing and the
+    serialization of the KG.
+    """
+    rdf_gen = RDFGenerator(
+        mapping_file=str(mapping_file),
+        platform_config=str(CONFIG),
+        **kwargs
+    )
+    timings = []
+    for _ in range(repetitions):
+        start_time = time.perf_counter()
+        rdf_gen.generate_rdf(
+            source_file=str(source_file),
+            destination_file=str(destination_file)
+        )
+        timings.append(time.perf_counter() - start_time)
+    return timings
+
+
+if __name__ == '__main__':
+    src = project_root / f'hotel_dataset/{HOTEL}.json'
+    results = {}
+    reference = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, mapping_options, rdf_options in VARIANTS:
+            mapping_file = Path(tmp_dir) / f"rml_{len(results)}.ttl"
+            rml_generator = RMLMappingGenerator(
+                rdf_relationship_file=str(REPORT),
+                output_file=str(mapping_file),
+                **mapping_options
+            )
+            rml_generator.load_intermediate_reports()
+            rml_generator.create_mapping_file()
+
+            dst = Path(tmp_dir) / f"{HOTEL}_{len(results)}.ttl"
+            timings = measure_generate_rdf(mapping_file, src, dst,
+                                           repetitions=repeat, **rdf_options)
+            triples = set(rdflib.Graph().parse(dst, format="turtle"))
+            if reference is None:
+                reference = triples
+            results[name] = (timings, len(triples), triples == reference)
+
+    for name, (timings, num_triples, same) in results.items():
+        print(f"generate_rdf for {HOTEL} with {name}")
+        print(f"Average: {sum(timings) / len(timings):.3f} s")
+        print(f"Min: {min(timings):.3f} s")
+        print(f"Max: {max(timings):.3f} s")
+        print(f"Triples: {num_triples}, same KG as with joins: {same}\n")
@@ -30,6 +30,7 @@ if __name__ == '__main__':
         platform_config=PLATTFORM_CONFIG,
         patterns_splitting=patterns[domain_ontology],
         # similarity_mode="semantic",
+        # suggestion_cache=f"{project_root_path}/kgcp/rml/suggestion_cache.sqlite",
         )
 
     # Load JSON and ontologies
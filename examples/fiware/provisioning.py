@@ -13,7 +13,8 @@ from filip.utils.cleanup import clear_all
 from requests.adapters import HTTPAdapter
 from urllib3 import Retry
 from datamodels.hotel_provision import initialize_room_entities, \
-    add_relationships, TemperatureSensorAmbFiware, HotelFiware
+    TemperatureSensorAmbFiware, HotelFiware
+from datamodels.batch_provision import provision_entities
 from pathlib import Path
 
 CB_URL = "http://localhost:1026"  # TODO change to valide url to access Orion Context Broker (NGSIv2) of FIWARE
@@ -74,14 +75,9 @@ if __name__ == '__main__':
 
         # initialize hotel entities
         hotel_fiware = HotelFiware(id=f"Hotel:{hotel_name}", name=hotel_name)
-        entities_hotel = [hotel_fiware,
-                          TemperatureSensorAmbFiware(id="AmbientTemperatureSensor",
-                                                     hasLocation=hotel_fiware.id)]
-        # Post entities to context broker
-        cbc.update(entities=entities_hotel, action_type="append",
-                   update_format="keyValues")
-        # add relationships
-        add_relationships(entities=entities_hotel, cb_client=cbc)
+        entities = [hotel_fiware,
+                    TemperatureSensorAmbFiware(id="AmbientTemperatureSensor",
+                                               hasLocation=hotel_fiware.id)]
 
         # initialize entities in rooms
         # create dict of type1: base, type2: co2, type3: presence, type4: timetable
@@ -89,18 +85,20 @@ if __name__ == '__main__':
             room_type = instance_dict[room_type_id]
             for i in range(1, num + 1):
                 room_name = f"room_{room_type}_{i}"
-                entities_in_room = initialize_room_entities(
+                entities.extend(initialize_room_entities(
                     room_name=room_name,
                     room_type=room_type,
                     hotel_id=hotel_fiware.id,
-                )
+                ))
 
-                # Post entities to context broker
-                cbc.update(entities=entities_in_room, action_type="append",
-                           update_format="keyValues")
-                # Add relationships to the entities
-                add_relationships(entities=entities_in_room, cb_client=cbc)
-                print(f"Successfully created entity for {room_name}\n")
+        # Post all entities with their relationships to context broker in
+        # concurrent batches, the relationships are resolved locally
+        provision_entities(entities=entities,
+                           cb_url=CB_URL,
+                           fiware_service=FIWARE_SERVICE,
+                           fiware_service_path=FIWARE_SERVICE_PATH,
+                           session=session)
+        print(f"Successfully created entities for {hotel_name}\n")
 
         # save all entities in a file
         all_entities = cbc.get_entity_list()
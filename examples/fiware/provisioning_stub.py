@@ -0,0 +1,41 @@
+"""
+Validate the batched provisioning (datamodels.batch_provision) against a local stub of
+Orion, without a FIWARE deployment. The keyValues entities of a hotel are taken from
+the exported dataset, which was provisioned with hotel_provision.add_relationships,
+and provisioned again in batches. The entities stored in the stub must equal the
+exported ones, including the "Relationship" attribute types.
+"""
+import json
+import time
+from pathlib import Path
+from examples.fiware.datamodels.batch_provision import provision_entities
+from examples.fiware.stub_orion import StubOrion
+
+project_root_path = Path(__file__).parent
+HOTEL = 'fiware_entities_1000rooms'
+FIWARE_SERVICE = 'fiware_demo'
+FIWARE_SERVICE_PATH = '/'
+
+if __name__ == '__main__':
+    with open(project_root_path / "hotel_dataset" / f"{HOTEL}.json", "r") as f:
+        exported = json.load(f)
+    # keyValues entities, as created by initialize_room_entities
+    entities = [{key: value["value"] if isinstance(value, dict) else value
+                 for key, value in entity.items()} for entity in exported]
+
+    orion = StubOrion()
+    start_time = time.perf_counter()
+    provision_entities(entities=entities,
+                       cb_url=orion.url,
+                       fiware_service=FIWARE_SERVICE,
+                       fiware_service_path=FIWARE_SERVICE_PATH,
+                       chunk_size=100,
+                       max_workers=4)
+    print(f"{len(entities)} entities provisioned in {time.perf_counter() - start_time:.3f} s "
+          f"with {len(orion.batch_sizes)} requests")
+
+    provisioned = {entity["id"]: entity
+                   for entity in orion.entities(FIWARE_SERVICE, FIWARE_SERVICE_PATH)}
+    same = provisioned == {entity["id"]: entity for entity in exported}
+    print(f"Same entities as in {HOTEL}.json: {same}")
+    orion.shutdown()
@@ -0,0 +1,27 @@
+"""
+Run the KGCP pipeline and the controller configuration for the hotels of pipeline.json.
+Stages whose inputs did not change are taken from the cache.
+"""
+from pathlib import Path
+from semantic_iot.pipeline import PipelineRunner, Stage, register_stage
+from application_deployment.controller_configuration import ControllerConfiguration
+
+MANIFEST = Path(__file__).parent / "pipeline.json"
+
+
+def run_controller_configuration(job: dict, upstream: Path, output: Path):
+    configuration = ControllerConfiguration(
+        rdf_kg_path=str(upstream),
+        output_file=str(output),
+    )
+    configuration.generate_configuration(use_containment_index=True)
+
+
+register_stage(Stage("controller", ".yml", run_controller_configuration))
+
+
+if __name__ == "__main__":
+    runner = PipelineRunner(MANIFEST)
+    results = runner.run(max_workers=3)
+    for hotel, artifacts in results.items():
+        print(f"{hotel}: {artifacts['controller']}")
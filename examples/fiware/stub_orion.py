@@ -0,0 +1,189 @@
+"""
+Local stand-in for the Orion Context Broker (NGSI-v2), to try out the ingestion and
+provisioning code without a FIWARE deployment. Only the endpoints used by the examples
+are implemented:
+    GET  /v2/entities       with limit, offset and options=count (Fiware-Total-Count)
+    POST /v2/op/update      with actionType append, appendStrict, update and delete
+    GET  /v2/subscriptions  with limit, offset and options=count
+    POST /v2/subscriptions
+For the bulk provisioning of devices, the same server also stands in for the north
+port of the IoT Agent:
+    GET  /iot/devices       with limit and offset
+    POST /iot/devices       with several devices
+    PUT  /iot/devices/<device_id>
+    GET  /iot/services, POST /iot/services
+Entities and registrations are kept per tenant (Fiware-Service, Fiware-ServicePath) in
+insertion order.
+"""
+import json
+import threading
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from examples.fiware.datamodels.batch_provision import attribute_type
+
+
+class StubOrionHandler(BaseHTTPRequestHandler):
+    # set by StubOrion
+    orion = None
+
+    def _tenant(self, collection: str = "entities") -> dict:
+        key = (self.headers.get("Fiware-Service", ""),
+               self.headers.get("Fiware-ServicePath", "/"))
+        path = urlparse(self.path).path
+        if path.startswith("/iot/devices/"):
+            path = "/iot/devices/{device_id}"
+        with self.orion.lock:
+            self.orion.request_counts[(self.command, path)] += 1
+            return self.orion.tenants.setdefault(key, {}).setdefault(collection, {})
+
+    def _read_body(self):
+        return json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def _page(self, items: list):
+        query = parse_qs(urlparse(self.path).query)
+        limit = int(query.get("limit", ["20"])[0])
+        offset = int(query.get("offset", ["0"])[0])
+        count = "count" in query.get("options", [""])[0].split(",")
+        return items[offset:offset + limit], limit, count
+
+    def _send_json(self, status: int, body=None, headers: dict = None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path in ("/v2/entities", "/v2/subscriptions"):
+            tenant = self._tenant(path.rsplit("/", 1)[1])
+            with self.orion.lock:
+                items = list(tenant.values())
+            page, limit, count = self._page(items)
+            if limit > 1000:
+                self._send_json(400, {"error": "BadRequest",
+                                      "description": "Bad pagination limit"})
+                return
+            headers = {"Fiware-Total-Count": str(len(items))} if count else {}
+            self._send_json(200, page, headers)
+        elif path == "/iot/devices":
+            tenant = self._tenant("devices")
+            with self.orion.lock:
+                items = list(tenant.values())
+            self._send_json(200, {"count": len(items), "devices": self._page(items)[0]})
+        elif path == "/iot/services":
+            tenant = self._tenant("services")
+            query = parse_qs(urlparse(self.path).query)
+            with self.orion.lock:
+                services = [s for s in tenant.values()
+                            if s["resource"] == query.get("resource", [s["resource"]])[0]
+                            and s["apikey"] == query.get("apikey", [s["apikey"]])[0]]
+            self._send_json(200, {"count": len(services), "services": services})
+        else:
+            self._send_json(404, {"error": "NotFound"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path == "/v2/op/update":
+            self._batch_update(self._tenant(), self._read_body())
+        elif path == "/v2/subscriptions":
+            tenant = self._tenant("subscriptions")
+            subscription = {"id": uuid.uuid4().hex[:24], **self._read_body(),
+                            "status": "active"}
+            with self.orion.lock:
+                tenant[subscription["id"]] = subscription
+            self._send_json(201, headers={"Location": f"/v2/subscriptions/{subscription['id']}"})
+        elif path in ("/iot/devices", "/iot/services"):
+            collection, key = ("devices", "device_id") if path == "/iot/devices" \
+                else ("services", "apikey")
+            tenant = self._tenant(collection)
+            items = self._read_body()[collection]
+            with self.orion.lock:
+                if any(item[key] in tenant for item in items):
+                    duplicate = True
+                else:
+                    duplicate = False
+                    tenant.update((item[key], item) for item in items)
+            if duplicate:
+                self._send_json(409, {"name": "DUPLICATE_DEVICE_ID"
+                                      if collection == "devices" else "DUPLICATE_GROUP"})
+            else:
+                self._send_json(201)
+        else:
+            self._send_json(404, {"error": "NotFound"})
+
+    def do_PUT(self):
+        path = urlparse(self.path).path
+        if not path.startswith("/iot/devices/"):
+            self._send_json(404, {"error": "NotFound"})
+            return
+        tenant = self._tenant("devices")
+        device_id = path[len("/iot/devices/"):]
+        update = self._read_body()
+        with self.orion.lock:
+            device = tenant.get(device_id)
+            if device is not None:
+                device.update(update)
+        self._send_json(204 if device is not None else 404)
+
+    def _batch_update(self, tenant: dict, body: dict):
+        action_type = body.get("actionType")
+        with self.orion.lock:
+            self.orion.batch_sizes.append(len(body["entities"]))
+            for entity in body["entities"]:
+                attrs = {key: {"type": attr.get("type") or attribute_type(attr.get("value")),
+                               "value": attr.get("value"),
+                               "metadata": attr.get("metadata", {})}
+                         for key, attr in entity.items() if key not in ("id", "type")}
+                stored = tenant.get(entity["id"])
+                if action_type == "delete":
+                    tenant.pop(entity["id"], None)
+                elif action_type in ("append", "appendStrict") or stored is not None:
+                    if stored is None:
+                        stored = tenant[entity["id"]] = {"id": entity["id"],
+                                                         "type": entity["type"]}
+                    stored.update(attrs)
+        self._send_json(204)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubOrion:
+    """Stub Orion served from a background thread on a free local port."""
+    def __init__(self, entities: list = None, service: str = "", service_path: str = "/"):
+        """
+        Args:
+            entities: Normalized entities of the tenant (service, service_path).
+        """
+        self.lock = threading.Lock()
+        self.tenants = {(service, service_path):
+                        {"entities": {e["id"]: e for e in entities or []}}}
+        # number of entities of each /v2/op/update request
+        self.batch_sizes = []
+        # number of requests per (method, path)
+        self.request_counts = Counter()
+        handler = type("Handler", (StubOrionHandler,), {"orion": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def registrations(self, collection: str, service: str = "",
+                      service_path: str = "/") -> list:
+        """Stored "entities", "subscriptions", "devices" or "services" of a tenant."""
+        with self.lock:
+            tenant = self.tenants.get((service, service_path), {})
+            return list(tenant.get(collection, {}).values())
+
+    def entities(self, service: str = "", service_path: str = "/") -> list:
+        return self.registrations("entities", service, service_path)
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
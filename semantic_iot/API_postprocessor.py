@@ -1,10 +1,100 @@
-import json
+import hashlib
+import os
+import pickle
 import re
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
 from pathlib import Path
+from typing import NamedTuple
 from urllib.parse import urlparse
+import prance
 from rdflib import Graph, Namespace, Literal, URIRef
 from rdflib.namespace import RDF
 from prance import ResolvingParser, ValidationError
+from prance.util import default_validation_backend
+from semantic_iot.utils.kg_store import load_graph, save_graph
+from semantic_iot.utils.streaming import NTriplesWriter, iter_value_uris, open_text
+
+
+def _validator_version() -> str:
+    """Identify prance and its validation backend together with their versions."""
+    backend = default_validation_backend()
+    try:
+        backend_version = metadata.version(backend)
+    except metadata.PackageNotFoundError:
+        backend_version = "unknown"
+    return f"prance-{prance.__version__}_{backend}-{backend_version}"
+
+
+def load_specification(api_spec_path: Path, spec_cache_dir: Path = None) -> dict:
+    """
+    Resolve and validate an API spec with prance's ResolvingParser.
+
+    If spec_cache_dir is given, the resolved specification is stored there as a
+    pickle artifact keyed by the hash of the spec file and the validator version,
+    so a cache hit returns exactly the parsed specification (including non-JSON
+    values and recursive $refs). Later calls load the artifact directly and skip the
+    validation, which is only redone when the spec file or the validator changes.
+    A specification that cannot be pickled is returned without caching it.
+    Note that only the spec file itself is hashed, external $ref targets are not.
+    """
+    cache_file = None
+    if spec_cache_dir is not None:
+        with open(api_spec_path, 'rb') as f:
+            spec_hash = hashlib.sha256(f.read()).hexdigest()
+        key = hashlib.sha256(f"{spec_hash}:{_validator_version()}".encode()).hexdigest()
+        cache_file = Path(spec_cache_dir) / f"{Path(api_spec_path).stem}_{key[:16]}.pickle"
+        if cache_file.exists():
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+
+    # Parse and validate spec
+    try:
+        parser = ResolvingParser(str(api_spec_path), lazy=False, strict=True)
+    except ValidationError as e:
+        raise RuntimeError(f"Spec validation failed: {e}")
+    spec = parser.specification
+
+    if cache_file is not None:
+        os.makedirs(cache_file.parent, exist_ok=True)
+        # write to a temporary file first, so that an interrupted run leaves no broken artifact
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(spec, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+            tmp_file.unlink(missing_ok=True)
+            print(f"The specification {api_spec_path} is not cached, "
+                  f"it cannot be serialized: {e}")
+            return spec
+        os.replace(tmp_file, cache_file)
+    return spec
+
+
+class ParameterDescriptor(NamedTuple):
+    """Inline header/query parameter of an operation, resolved once per template."""
+    location: str       # "header" or "query"
+    clean_name: str     # local name used in api:{req_id}_Param_{clean_name}
+    name: Literal
+    value: Literal
+    shared_node: URIRef = None  # content-addressed node, if parameters are shared
+
+
+class OperationDescriptor(NamedTuple):
+    """Spec metadata of one (template, verb) pair needed to emit request nodes."""
+    template: str
+    verb: str
+    method_name: Literal
+    parameters: tuple   # tuple[ParameterDescriptor, ...]
+
+
+class PreparedSpec(NamedTuple):
+    """Spec-derived structures that can be shared by postprocessors of several KGs."""
+    spec: dict
+    methods_map: dict        # {tpl: (segments, verbs)}
+    operations: dict         # {(tpl, VERB): OperationDescriptor}
+    global_parameters: tuple  # tuple[(name, ParameterDescriptor), ...]
+    share_parameters: bool
 
 
 class APIPostprocessor:
@@ -12,28 +102,49 @@ class APIPostprocessor:
     Post-process API responses and extend an RDF graph using Prance to load
     either Swagger 2.0 or OpenAPI 3.x specs via the ResolvingParser.
     """
-    def __init__(self, kg_path: Path, api_spec_path: Path, http_onto: Path = None):
+    def __init__(self, kg_path: Path, api_spec_path: Path, http_onto: Path = None,
+                 spec_cache_dir: Path = None, load_kg: bool = True,
+                 prepared_spec: PreparedSpec = None):
+        """
+        Args:
+            kg_path: Path to the KG (Turtle, or SQLite store, see utils.kg_store) to be
+                extended.
+            api_spec_path: Path to the Swagger 2.0 or OpenAPI 3.x spec.
+            http_onto: Path to the HTTP ontology. By default, the bundled Http.ttl is used.
+            spec_cache_dir: Optional directory to cache the resolved and validated spec.
+                If given, the validation is only redone when the spec file changes.
+            load_kg: Parse the KG into self.kg. Set to False to only use
+                extend_kg_streaming, which never loads the KG into memory.
+            prepared_spec: Spec-derived structures of another postprocessor (see
+                prepare_spec). If given, the spec is neither parsed nor validated again.
+        """
         self.api_spec_path = api_spec_path
+        self.kg_path = kg_path
         self.kg = Graph()
-        self._load_kg_and_ontology(kg_path)
+        if load_kg:
+            self._load_kg_and_ontology(kg_path)
+        # graph (or writer) receiving the HTTP triples
+        self.sink = self.kg
         if http_onto is None:
             http_onto = Path(__file__).parent / 'ontology' / 'Http.ttl'
         self.http_onto = http_onto
         self._setup_namespaces()
 
-        # Parse and validate spec
-        try:
-            self.parser = ResolvingParser(str(api_spec_path), lazy=False, strict=True)
-        except ValidationError as e:
-            raise RuntimeError(f"Spec validation failed: {e}")
-
-        # Raw spec dict
-        self.spec = self.parser.specification
+        if prepared_spec is not None:
+            self.spec = prepared_spec.spec
+        else:
+            # Parse and validate spec (or load the cached resolved spec)
+            self.spec = load_specification(api_spec_path, spec_cache_dir=spec_cache_dir)
+        self._prepared_spec = prepared_spec
 
         self.base_paths = self._get_server_base_paths()
+        self._emitted_shared_nodes = set()
+        # parsed HTTP ontology, may be given by APIBatchPostprocessor
+        self._http_onto_triples = None
 
     def _load_kg_and_ontology(self, kg_path: Path):
-        self.kg.parse(str(kg_path), format='turtle')
+        # the KG is modified, so a SQLite store is copied into memory
+        self.kg = load_graph(kg_path, in_memory=True)
 
 
     def _setup_namespaces(self):
@@ -75,22 +186,87 @@ class APIPostprocessor:
         # If nothing explicit, match “no base”
         return sorted(bases) or [""]
 
-    def extend_kg(self, add_http_ontology: bool = False):
+    def extend_kg(self, add_http_ontology: bool = False, share_parameters: bool = False):
+        """
+        Add http:Request nodes for all rdf:value URIs that match a path of the spec.
+
+        Args:
+            add_http_ontology: Also load the HTTP ontology into the KG.
+            share_parameters: Content-address inline header/query parameter nodes by
+                (location, name, default value), so that identical parameters are
+                shared by all requests instead of being minted once per request.
+        """
         if add_http_ontology:
             # Optionally load HTTP ontology
             self.kg.parse(str(self.http_onto), format='turtle')
-        conn = self._create_connection_node()
-        shared_headers, shared_queries = self._index_global_parameters()
-        uris = self._gather_value_uris()
-        methods_map = self._prepare_methods_map()
+        self._add_http_triples(self._gather_value_uris(), share_parameters=share_parameters)
 
-        if not methods_map:
-            raise RuntimeError(
-                "No operations collected from spec. "
-                "Check servers/basePath and that paths contain supported HTTP methods."
-            )
+    def extend_kg_streaming(self, destination: Path, append: bool = False,
+                            share_parameters: bool = False, kg_format: str = None,
+                            add_http_ontology: bool = False) -> int:
+        """
+        Graph-free variant of extend_kg. The KG file is scanned line by line for
+        rdf:value URIs and only the new HTTP triples are written as N-Triples to
+        destination, so the original KG is neither held in memory nor re-serialized.
+
+        Args:
+            destination: File receiving the HTTP triples. It may be the KG file itself
+                with append=True, since N-Triples lines are valid Turtle.
+            append: Append to destination instead of overwriting it.
+            share_parameters: See extend_kg.
+            kg_format: "nt" or "turtle". By default, guessed from the file name.
+            add_http_ontology: Also write the triples of the HTTP ontology.
+
+        Returns:
+            Number of written triples.
+        """
+        uris = iter_value_uris(self.kg_path, rdf_format=kg_format)
+        if append and Path(destination).exists() and \
+                Path(destination).resolve() == Path(self.kg_path).resolve():
+            # do not read the file while appending to it
+            uris = list(uris)
+
+        with open_text(destination, 'a' if append else 'w') as f:
+            if append:
+                f.write("\n")
+            self.sink = NTriplesWriter(f)
+            try:
+                if add_http_ontology:
+                    for triple in self.get_http_onto_triples():
+                        self.sink.add(triple)
+                self._add_http_triples(uris, share_parameters=share_parameters)
+                count = self.sink.count
+            finally:
+                self.sink = self.kg
+        print(f"{count} HTTP triples written to {destination}")
+        return count
+
+    def get_http_onto_triples(self) -> list:
+        """Triples of the HTTP ontology, parsed on first use."""
+        if self._http_onto_triples is None:
+            self._http_onto_triples = list(
+                Graph().parse(str(self.http_onto), format='turtle'))
+        return self._http_onto_triples
+
+    def _add_http_triples(self, uris, share_parameters: bool = False):
+        """
+        Add request nodes for the given rdf:value URIs to self.sink.
+        """
+        prepared = self.prepare_spec(share_parameters=share_parameters)
+        methods_map = prepared.methods_map
+        operations = prepared.operations
+
+        conn = self._create_connection_node()
+        shared_headers, shared_queries = self._index_global_parameters(
+            prepared.global_parameters)
+        self._emitted_shared_nodes = set()
+        # a URL that occurs more than once gets its request nodes only once
+        seen_uris = set()
 
         for uri in uris:
+            if uri in seen_uris:
+                continue
+            seen_uris.add(uri)
             parsed = urlparse(str(uri))
             orig_path = re.sub(r'/+', '/', parsed.path or '/')
 
@@ -100,25 +276,50 @@ class APIPostprocessor:
                     if not self._match_path_to_template(candidate, tpl_segments):
                         continue
 
+                    clean_path = re.sub(r"\W+", '_', orig_path)
                     for verb in verbs:
-                        clean_path = re.sub(r"\W+", '_', orig_path)
-                        req_id = f"{verb}_{clean_path}"
-                        req = self.API[req_id]
-
-                        op = self._get_operation(tpl, verb.lower())
-                        if not op:
+                        descriptor = operations.get((tpl, verb))
+                        if descriptor is None:
                             continue
 
+                        req_id = f"{verb}_{clean_path}"
+                        req = self.API[req_id]
                         self._create_request_node(
-                            req_id, req, verb, orig_path, uri,
+                            req_id, req, orig_path, uri,
                             parsed.netloc, shared_headers,
-                            shared_queries, op, conn
+                            shared_queries, descriptor, conn
                         )
                     matched = True
                     break
                 if matched:
                     break
 
+    def prepare_spec(self, share_parameters: bool = False) -> PreparedSpec:
+        """
+        Collect the spec-derived structures (path templates, operation descriptors and
+        global parameters) once. The result is reused by later extensions and can be
+        passed to postprocessors of other KGs sharing the same spec.
+        """
+        prepared = self._prepared_spec
+        if prepared is not None and prepared.share_parameters == share_parameters:
+            return prepared
+
+        methods_map = self._prepare_methods_map()
+        if not methods_map:
+            raise RuntimeError(
+                "No operations collected from spec. "
+                "Check servers/basePath and that paths contain supported HTTP methods."
+            )
+        self._prepared_spec = PreparedSpec(
+            spec=self.spec,
+            methods_map=methods_map,
+            operations=self._prepare_operation_descriptors(
+                methods_map, share_parameters=share_parameters),
+            global_parameters=self._prepare_global_parameters(),
+            share_parameters=share_parameters,
+        )
+        return self._prepared_spec
+
     def _get_operation(self, tpl: str, method: str) -> dict:
         """
         Return operation dict and merge any path-item parameters into it.
@@ -135,47 +336,113 @@ class APIPostprocessor:
 
         return op
 
+    def _prepare_operation_descriptors(self, methods_map: dict,
+                                       share_parameters: bool = False) -> dict:
+        """
+        Resolve operation and inline parameter metadata once per (template, verb),
+        so that emitting a request node only stamps out triples.
+        Return: {(tpl, VERB): OperationDescriptor}
+        """
+        descriptors = {}
+        for tpl, (_, verbs) in methods_map.items():
+            for verb in verbs:
+                op = self._get_operation(tpl, verb.lower())
+                if not op:
+                    continue
+                descriptors[(tpl, verb)] = OperationDescriptor(
+                    template=tpl,
+                    verb=verb,
+                    method_name=Literal(verb),
+                    parameters=self._prepare_parameter_descriptors(op, share_parameters),
+                )
+        return descriptors
+
+    def _prepare_parameter_descriptors(self, op: dict, share_parameters: bool = False) -> tuple:
+        """
+        Collect the inline header and query parameters of an operation
+        (body and the entityId/attrName path parameters are ignored).
+        """
+        parameters = []
+        for p in op.get('parameters', []) or []:
+            location = p.get('in')
+            if location not in ('header', 'query'):
+                continue
+            clean = re.sub(r"\W+", '_', p.get('name', 'param')).strip('_')
+            name = p.get('name', '')
+            value = self._param_default_value(p)
+            shared_node = None
+            if share_parameters:
+                shared_node = self._shared_parameter_node(location, clean, name, value)
+            parameters.append(ParameterDescriptor(
+                location=location,
+                clean_name=clean,
+                name=Literal(name),
+                value=Literal(value),
+                shared_node=shared_node,
+            ))
+        return tuple(parameters)
+
+    def _shared_parameter_node(self, location: str, clean: str, name: str, value) -> URIRef:
+        """
+        Content-addressed node for an inline parameter, e.g. api:Header_fiware_service_0fa6e68d63.
+        """
+        digest = hashlib.sha1(f"{location}\x00{name}\x00{value}".encode()).hexdigest()[:10]
+        prefix = "Header" if location == 'header' else "Query"
+        return self.API[f"{prefix}_{clean}_{digest}"]
+
     def _matching_candidates(self, path: str) -> list[str]:
         # normalize duplicates like // -> /
         path = re.sub(r'/+', '/', path or '/')
         return [path]
 
-    def _index_global_parameters(self) -> tuple:
+    def _prepare_global_parameters(self) -> tuple:
         """
-        Index globally-declared parameters and materialize them as shared header/query nodes.
-        Handles Swagger2 (spec['parameters']) and OAS3 (spec['components']['parameters']).
+        Collect globally-declared header/query parameters as (name, ParameterDescriptor).
+        Handles Swagger2 (spec['parameters']). OAS3 components.parameters are only
+        reusable definitions, which the resolving parser already inlines into the
+        operations referencing them, so they are not attached to every request.
         """
-        header_nodes = {}
-        query_nodes = {}
+        parameters = []
 
-        # Swagger2: spec['parameters'], OAS3: spec['components']['parameters']
+        # Swagger2: spec['parameters']
         if 'swagger' in self.spec:
             global_params = self.spec.get('parameters', {}) or {}
         else:
-            global_params = (
-                (self.spec.get('components') or {}).get('parameters', {}) or {}
-            )
+            global_params = {}
 
         for name, p in global_params.items():
             # Resolve $ref if any (Prance ResolvingParser should already do it)
             if isinstance(p, dict) and '$ref' in p:
                 # In practice, ResolvingParser dereferences already; keep fallback just in case
                 continue
+            if p.get('in') not in ('header', 'query'):
+                continue
 
             clean = re.sub(r"\W+", '_', name).strip('_')
-            node = self.API[f"Param_{clean}"]
-
-            if p.get('in') == 'header':
-                self.kg.add((node, RDF.type, self.HTTP.MessageHeader))
-                self.kg.add((node, self.HTTP.fieldName, Literal(p.get('name', name))))
-                self.kg.add((node, self.HTTP.fieldValue, Literal(self._param_default_value(p))))
-                header_nodes[name] = node
+            parameters.append((name, ParameterDescriptor(
+                location=p.get('in'),
+                clean_name=clean,
+                name=Literal(p.get('name', name)),
+                value=Literal(self._param_default_value(p)),
+                shared_node=self.API[f"Param_{clean}"],
+            )))
+        return tuple(parameters)
+
+    def _index_global_parameters(self, global_parameters: tuple = None) -> tuple:
+        """
+        Materialize globally-declared parameters as shared header/query nodes.
+        """
+        if global_parameters is None:
+            global_parameters = self._prepare_global_parameters()
+        header_nodes = {}
+        query_nodes = {}
 
-            elif p.get('in') == 'query':
-                self.kg.add((node, RDF.type, self.HTTP.Parameter))
-                self.kg.add((node, self.HTTP.paramName, Literal(p.get('name', name))))
-                self.kg.add((node, self.HTTP.paramValue, Literal(self._param_default_value(p))))
-                query_nodes[name] = node
+        for name, p in global_parameters:
+            self._add_parameter_node(p.shared_node, p)
+            if p.location == 'header':
+                header_nodes[name] = p.shared_node
+            else:
+                query_nodes[name] = p.shared_node
 
         return header_nodes, query_nodes
 
@@ -259,54 +526,184 @@ class APIPostprocessor:
 
     def _create_connection_node(self):
         conn = self.API['Connection_Main']
-        self.kg.add((conn, RDF.type, self.HTTP.Connection))
+        self.sink.add((conn, RDF.type, self.HTTP.Connection))
         return conn
 
     def _create_request_node(
-        self, req_id, req: URIRef, verb: str, path: str,
+        self, req_id, req: URIRef, path: str,
         uri: URIRef, authority: str,
         shared_headers: dict, shared_queries: dict,
-        op: dict, conn: URIRef
+        descriptor: OperationDescriptor, conn: URIRef
     ):
         # core triples
-        self.kg.add((req, RDF.type, self.HTTP.Request))
-        self.kg.add((req, self.HTTP.methodName, Literal(verb)))
-        self.kg.add((req, self.HTTP.absolutePath, Literal(path)))
-        self.kg.add((req, self.HTTP.absoluteURI, URIRef(str(uri))))
-        self.kg.add((req, self.HTTP.authority, Literal(authority)))
-        self.kg.add((conn, self.HTTP.requests, req))
+        self.sink.add((req, RDF.type, self.HTTP.Request))
+        self.sink.add((req, self.HTTP.methodName, descriptor.method_name))
+        self.sink.add((req, self.HTTP.absolutePath, Literal(path)))
+        self.sink.add((req, self.HTTP.absoluteURI, URIRef(str(uri))))
+        self.sink.add((req, self.HTTP.authority, Literal(authority)))
+        self.sink.add((conn, self.HTTP.requests, req))
 
         # attach shared
         for node in shared_headers.values():
-            self.kg.add((req, self.HTTP.headers, node))
+            self.sink.add((req, self.HTTP.headers, node))
         for node in shared_queries.values():
-            self.kg.add((req, self.HTTP.params, node))
-
-        # inline parameters (ignore body)
-        for p in op.get('parameters', []) or []:
-            if p.get('in') == 'body':
-                continue
-            if p.get('in') == 'path' and p.get('name') in ('entityId', 'attrName'):
-                # Skip these path params as per original behavior
-                continue
-
-            clean = re.sub(r"\W+", '_', p.get('name', 'param')).strip('_')
-            node = self.API[f"{req_id}_Param_{clean}"]
-
-            if p.get('in') == 'header':
-                self.kg.add((node, RDF.type, self.HTTP.MessageHeader))
-                self.kg.add((node, self.HTTP.fieldName, Literal(p.get('name', ''))))
-                self.kg.add((node, self.HTTP.fieldValue,
-                             Literal(self._param_default_value(p))))
-                self.kg.add((req, self.HTTP.headers, node))
-
-            elif p.get('in') == 'query':
-                self.kg.add((node, RDF.type, self.HTTP.Parameter))
-                self.kg.add((node, self.HTTP.paramName, Literal(p.get('name', ''))))
-                self.kg.add((node, self.HTTP.paramValue,
-                             Literal(self._param_default_value(p))))
-                self.kg.add((req, self.HTTP.params, node))
+            self.sink.add((req, self.HTTP.params, node))
+
+        # inline parameters, resolved once per template
+        for p in descriptor.parameters:
+            if p.shared_node is None:
+                node = self.API[f"{req_id}_Param_{p.clean_name}"]
+                self._add_parameter_node(node, p)
+            else:
+                # shared nodes are only described once
+                node = p.shared_node
+                if node not in self._emitted_shared_nodes:
+                    self._add_parameter_node(node, p)
+                    self._emitted_shared_nodes.add(node)
+
+            if p.location == 'header':
+                self.sink.add((req, self.HTTP.headers, node))
+            else:
+                self.sink.add((req, self.HTTP.params, node))
+
+    def _add_parameter_node(self, node: URIRef, p: ParameterDescriptor):
+        if p.location == 'header':
+            self.sink.add((node, RDF.type, self.HTTP.MessageHeader))
+            self.sink.add((node, self.HTTP.fieldName, p.name))
+            self.sink.add((node, self.HTTP.fieldValue, p.value))
+        else:
+            self.sink.add((node, RDF.type, self.HTTP.Parameter))
+            self.sink.add((node, self.HTTP.paramName, p.name))
+            self.sink.add((node, self.HTTP.paramValue, p.value))
 
 
     def serialize(self, destination: Path):
-        self.kg.serialize(destination=str(destination), format='turtle')
+        save_graph(self.kg, destination)
+
+
+# state of the worker processes of APIBatchPostprocessor, set by _init_batch_worker
+_batch_worker_state = {}
+
+
+def _init_batch_worker(api_spec_path, http_onto, prepared_spec, http_onto_triples):
+    _batch_worker_state.update(
+        api_spec_path=api_spec_path,
+        http_onto=http_onto,
+        prepared_spec=prepared_spec,
+        http_onto_triples=http_onto_triples,
+    )
+
+
+def _extend_kg_worker(kg_path: Path, output_path: Path, add_http_ontology: bool,
+                      streaming: bool) -> Path:
+    state = _batch_worker_state
+    prepared_spec = state["prepared_spec"]
+    postprocessor = APIPostprocessor(
+        kg_path=kg_path,
+        api_spec_path=state["api_spec_path"],
+        http_onto=state["http_onto"],
+        load_kg=not streaming,
+        prepared_spec=prepared_spec
+    )
+    # the ontology is parsed once by the batch, not once per KG
+    postprocessor._http_onto_triples = state["http_onto_triples"]
+    if streaming:
+        postprocessor.extend_kg_streaming(output_path,
+                                          share_parameters=prepared_spec.share_parameters,
+                                          add_http_ontology=add_http_ontology)
+        return output_path
+
+    if add_http_ontology:
+        for triple in postprocessor.get_http_onto_triples():
+            postprocessor.kg.add(triple)
+    postprocessor.extend_kg(share_parameters=prepared_spec.share_parameters)
+    postprocessor.serialize(output_path)
+    return output_path
+
+
+class APIBatchPostprocessor:
+    """
+    Extend many KGs sharing one API spec with HTTP metadata. The spec is parsed,
+    validated and prepared only once, and the KGs are extended concurrently in a
+    process pool.
+    """
+    def __init__(self, api_spec_path: Path, http_onto: Path = None,
+                 spec_cache_dir: Path = None, share_parameters: bool = False):
+        """
+        Args:
+            api_spec_path: Path to the Swagger 2.0 or OpenAPI 3.x spec shared by all KGs.
+            http_onto: Path to the HTTP ontology. By default, the bundled Http.ttl is used.
+            spec_cache_dir: Optional directory to cache the resolved and validated spec.
+            share_parameters: See APIPostprocessor.extend_kg.
+        """
+        self.api_spec_path = api_spec_path
+        # postprocessor without KG, only used to prepare the spec
+        prototype = APIPostprocessor(
+            kg_path=None,
+            api_spec_path=api_spec_path,
+            http_onto=http_onto,
+            spec_cache_dir=spec_cache_dir,
+            load_kg=False
+        )
+        self.http_onto = prototype.http_onto
+        self.prepared_spec = prototype.prepare_spec(share_parameters=share_parameters)
+        self._prototype = prototype
+
+    @staticmethod
+    def default_output_path(kg_path: Path, streaming: bool = False) -> Path:
+        """E.g. hotel.ttl -> hotel_extended.ttl (or hotel_http.nt in streaming mode)."""
+        kg_path = Path(kg_path)
+        if streaming:
+            return kg_path.with_name(f"{kg_path.stem}_http.nt")
+        return kg_path.with_name(f"{kg_path.stem}_extended.ttl")
+
+    def extend_kgs(self, kg_paths: list, output_paths: list = None,
+                   add_http_ontology: bool = False, streaming: bool = False,
+                   max_workers: int = None) -> list:
+        """
+        Extend each KG and write it to its own output file.
+
+        Args:
+            kg_paths: Paths of the KGs (Turtle) to be extended.
+            output_paths: Output path for each KG. By default, "_extended.ttl" is
+                appended to the KG file name.
+            add_http_ontology: Also add the HTTP ontology to each extended KG (to the
+                written HTTP triples in streaming mode).
+            streaming: Use extend_kg_streaming, i.e. only write the new HTTP triples
+                (N-Triples) without loading the KGs.
+            max_workers: Number of worker processes. By default, the number of CPUs.
+                With max_workers=1 the KGs are processed in the current process.
+
+        Returns:
+            List of the written output paths, in the order of kg_paths.
+        """
+        kg_paths = [Path(p) for p in kg_paths]
+        if output_paths is None:
+            output_paths = [self.default_output_path(p, streaming) for p in kg_paths]
+        else:
+            output_paths = [Path(p) for p in output_paths]
+        if len(output_paths) != len(kg_paths):
+            raise ValueError("The number of output paths must match the number of KGs.")
+
+        initargs = (
+            self.api_spec_path,
+            self.http_onto,
+            self.prepared_spec,
+            self._prototype.get_http_onto_triples() if add_http_ontology else None,
+        )
+        jobs = [(kg, out, add_http_ontology, streaming)
+                for kg, out in zip(kg_paths, output_paths)]
+
+        if max_workers == 1:
+            _init_batch_worker(*initargs)
+            results = [_extend_kg_worker(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     initializer=_init_batch_worker,
+                                     initargs=initargs) as executor:
+                futures = [executor.submit(_extend_kg_worker, *job) for job in jobs]
+                results = [future.result() for future in futures]
+
+        for kg, out in zip(kg_paths, results):
+            print(f"Extended {kg} with HTTP metadata: {out}")
+        return results
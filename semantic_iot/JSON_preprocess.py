@@ -1,5 +1,6 @@
 import json
 import logging
+from typing import Iterable
 
 class JSONPreprocessor:
     def __init__(self,
@@ -41,11 +42,19 @@ class JSONPreprocessor:
         """Load and process JSON data."""
         with open(self.json_file_path, 'r') as file:
             entities = json.load(file)
+        self.load_entities(entities)
 
+    def load_entities(self, entities: Iterable[dict]):
+        """
+        Process entities from any iterable instead of a JSON file, e.g. the entities
+        streamed page by page from a platform by NGSIv2Source.iter_entities().
+        """
+        all_entities = []
         entities_for_mapping = []
         entity_types = set()
 
         for entity in entities:
+            all_entities.append(entity)
             unique_identifier = entity.get(self.unique_identifier_key)
             entity_type_values = [self.get_value(entity, key) for key in
                                   self.entity_type_keys if self.get_value(entity, key)]
@@ -67,7 +76,7 @@ class JSONPreprocessor:
                     logging.warning(
                         f"Error: Entity type keys '{self.entity_type_keys}' not found or empty in entity: {entity}")
 
-        self.entities = entities
+        self.entities = all_entities
         self.entities_for_mapping = entities_for_mapping
         self.entity_types = entity_types
 
@@ -1,15 +1,25 @@
+import json
 import os
+from typing import Callable, Iterable
 
 import morph_kgc
 import rdflib
 from rdflib import URIRef, Namespace
+from rdflib.namespace import RDF
 from semantic_iot.JSON_preprocess import JSONPreprocessor, JSONPreprocessorHandler
+from semantic_iot.RML_generator import ALL_ENTITIES_SOURCE, NODE_IRI_BASE
+from semantic_iot.utils.kg_store import save_graph
+
+RML = Namespace("http://semweb.mmlab.be/ns/rml#")
 
 
 class RDFGenerator:
     def __init__(self,
                  mapping_file: str,
-                 platform_config: str):
+                 platform_config: str,
+                 partition_sources: bool = False,
+                 check_references: bool = False,
+                 preprocess_file: str = None):
         """
         Generate RDF knowledge graph from a JSON data using RML mapping file.
         Currently, [morph-kgc, ...] RML engines are supported.
@@ -18,19 +28,30 @@ class RDFGenerator:
             mapping_file: path to the RML mapping file.
             platform_config: path to the platform configuration file. Check
                 JSONPreprocessor for more details.
+            partition_sources: the mapping file was generated with
+                RMLMappingGenerator(partition_sources=True). The preprocessed
+                entities are passed to the RML engine in memory, one source per
+                entity type, instead of being written to a file.
+            check_references: drop relationships to nodes that do not exist, i.e.
+                node IRIs that are not typed in the generated graph. Use it with
+                mappings from RMLMappingGenerator(join_free=True) to get the same
+                graph as with joins.
+            preprocess_file: path of the temporary preprocessed JSON file. Use different
+                files to run several generators at the same time.
         """
         self.mapping_file = mapping_file
-        self.preprocess_file = os.path.dirname(__file__) + "\\preprocessed.json"
+        self.partition_sources = partition_sources
+        self.check_references = check_references
+        if preprocess_file is None:
+            preprocess_file = os.path.join(os.path.dirname(__file__), "preprocessed.json")
+        self.preprocess_file = preprocess_file
+        self._mapping_sources = None
 
         self.json_processor: JSONPreprocessor = JSONPreprocessorHandler(
             preprocessed_file_path=self.preprocess_file,
             platform_config=platform_config
         ).json_preprocessor
 
-    def pre_process(self):
-        self.json_processor.load_json_data()
-        self.json_processor.save_preprocessed_data()
-
     def clean_up(self):
         # remove file self.preprocess_file
         os.remove(self.preprocess_file)
@@ -41,22 +62,77 @@ class RDFGenerator:
                      engine: str = "morph-kgc"
                      ):
         self.json_processor.json_file_path = source_file
-        if engine == "morph-kgc":
-            self.pre_process()
+        self._generate(self.json_processor.load_json_data, destination_file, engine)
+
+    def generate_rdf_from_entities(self,
+                                   entities: Iterable[dict],
+                                   destination_file: str,
+                                   engine: str = "morph-kgc"
+                                   ):
+        """
+        Generate the KG from entities streamed from a platform, e.g.
+        NGSIv2Source(...).iter_entities(), instead of a JSON file. With
+        partition_sources, the entities are passed to the RML engine in memory and no
+        file is written besides the destination.
+        """
+        self._generate(lambda: self.json_processor.load_entities(entities),
+                       destination_file, engine)
+
+    def _generate(self, load_entities: Callable, destination_file: str, engine: str):
+        if engine != "morph-kgc":
+            raise ValueError("Invalid engine. Please use 'morph-kgc'")
+        load_entities()
+        if self.partition_sources:
+            self.morph_kgc_mapper(destination_file=destination_file,
+                                  python_source=self.partitioned_sources())
+        else:
+            self.json_processor.save_preprocessed_data()
             self.morph_kgc_mapper(destination_file=destination_file)
             self.clean_up()
-        else:
-            raise ValueError("Invalid engine. Please use 'morph-kgc'")
+
+    def mapping_sources(self) -> set:
+        """Names of the in-memory sources ("{<name>}") referenced by the mapping file."""
+        if self._mapping_sources is None:
+            mapping = rdflib.Graph().parse(self.mapping_file, format="turtle")
+            self._mapping_sources = {
+                str(source)[1:-1] for source in mapping.objects(None, RML.source)
+                if str(source).startswith("{") and str(source).endswith("}")}
+        return self._mapping_sources
+
+    def partitioned_sources(self) -> dict:
+        """
+        In-memory sources of the preprocessed entities, one JSON array per entity type
+        and one with all entities, see RMLMappingGenerator.partition_source. Every
+        source of the mapping is given, an entity type without entities in the data
+        gets an empty array.
+        """
+        entities_by_type = {name: [] for name in self.mapping_sources()}
+        for entity in self.json_processor.entities_for_mapping:
+            entities_by_type.setdefault(entity['type'], []).append(entity)
+        sources = {entity_type: json.dumps(entities)
+                   for entity_type, entities in entities_by_type.items()}
+        sources[ALL_ENTITIES_SOURCE] = json.dumps(self.json_processor.entities_for_mapping)
+        return sources
 
     def morph_kgc_mapper(self,
-                         destination_file: str):
-        config = f"""
-                 [DataSourceJSON]
-                 mappings: {self.mapping_file}
-                 file_path: {self.preprocess_file}
-             """
-        g = morph_kgc.materialize(config)
+                         destination_file: str,
+                         python_source: dict = None):
+        if python_source is None:
+            config = f"""
+                     [DataSourceJSON]
+                     mappings: {self.mapping_file}
+                     file_path: {self.preprocess_file}
+                 """
+        else:
+            # the sources are given in the mapping and resolved from python_source
+            config = f"""
+                     [DataSourceJSON]
+                     mappings: {self.mapping_file}
+                 """
+        g = morph_kgc.materialize(config, python_source=python_source)
         g = self.add_namespace(g)
+        if self.check_references:
+            self.remove_dangling_references(g)
 
         for s, p, o in g:
             new_s = URIRef(self.decode_uri(str(s))) if isinstance(s, URIRef) else s
@@ -65,9 +141,25 @@ class RDFGenerator:
             g.remove((s, p, o))
             g.add((new_s, new_p, new_o))
 
-        g.serialize(destination=destination_file, format="turtle")
+        # Turtle, or the SQLite store for a ".sqlite" or ".db" destination
+        save_graph(g, destination_file)
         print(f"Namespaces have been added and saved to {destination_file}")
 
+    @staticmethod
+    def remove_dangling_references(g):
+        """
+        Remove triples whose object is a node IRI (NODE_IRI_BASE) without rdf:type,
+        i.e. a reference to a node that no TriplesMap generated.
+        """
+        typed_nodes = set(g.subjects(RDF.type, None))
+        dangling = [(s, p, o) for s, p, o in g
+                    if isinstance(o, URIRef) and o.startswith(NODE_IRI_BASE)
+                    and o not in typed_nodes]
+        for triple in dangling:
+            g.remove(triple)
+        if dangling:
+            print(f"{len(dangling)} references to missing nodes removed")
+
     @staticmethod
     def decode_uri(uri):
         return uri.replace("%3A", ":")
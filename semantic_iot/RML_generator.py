@@ -1,15 +1,52 @@
+import hashlib
 import json
 import os
-from jinja2 import Environment, FileSystemLoader
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
 # from results.eval_computing_resource import ResourceMonitor
 # from utils import validate_folder_path
 
+RML_TEMPLATE_DIR = os.path.dirname(__file__)
+RML_TEMPLATE_NAME = "iot_rml_template.ttl.jinja2"
+
+# Base of the node IRIs, http://example.com/<nodetype>/<id>, see iot_rml_template.ttl.jinja2
+NODE_IRI_BASE = "http://example.com/"
+
+# In-memory logical source (see morph-kgc) with all entities, used with partition_sources
+# for TriplesMaps whose iterator does not select a single entity type
+ALL_ENTITIES_SOURCE = "_all_entities"
+
+# Iterator that selects the entities of one type, e.g. $[?(@.type=='HotelRoom')]
+TYPE_ITERATOR_PATTERN = re.compile(r"""^\$\[\?\(@\.type\s*==\s*(['"])(.+)\1\)\]$""")
+
+
+@lru_cache(maxsize=None)
+def _rml_template_environment(template_dir: str) -> Environment:
+    # The bytecode cache (in the temp directory) lets new processes skip compiling
+    return Environment(loader=FileSystemLoader(template_dir),
+                       bytecode_cache=FileSystemBytecodeCache())
+
+
+def load_rml_template(template_dir: str = RML_TEMPLATE_DIR,
+                      template_name: str = RML_TEMPLATE_NAME) -> Template:
+    """
+    Load the compiled Jinja based template of the RML Mapping file. The environment is
+    created once per template directory, and it caches the compiled template, which is
+    only recompiled when the template file changes.
+    """
+    return _rml_template_environment(template_dir).get_template(template_name)
+
 
 class RMLMappingGenerator:
     def __init__(self,
                  rdf_relationship_file: str,
                  output_file: str,
-                 entities_file: str = None
+                 entities_file: str = None,
+                 partition_sources: bool = False,
+                 join_free: bool = False
                  ):
         """
         Generate RML Mapping file based on the "RDF node relationship" file that
@@ -23,12 +60,24 @@ class RMLMappingGenerator:
             entities_file: Path to the entities file that should be written into
                     the RML Mapping file. By default, it is None, and "placeholder.json"
                     will be used.
+            partition_sources: Give each entity type its own in-memory logical source
+                    "{<type>}" with the iterator "$[*]", instead of filtering the
+                    entities file by type in every TriplesMap. The mapping must be
+                    materialized with RDFGenerator(partition_sources=True).
+            join_free: Map relationships directly to the IRI of the related node,
+                    http://example.com/<relatedNodeType>/{<rawdataidentifier>}, instead
+                    of joining with its TriplesMap. Unlike the join, this also creates
+                    references to nodes that are not in the data. Materialize with
+                    RDFGenerator(check_references=True) to drop those.
         """
         self.rdf_relationship_file = rdf_relationship_file
+        self.partition_sources = partition_sources
+        self.join_free = join_free
         self.output_file = output_file
         self.rdf_relationships = None
         if entities_file is None:
-            self.entities_file = "placeholder.json"
+            entities_file = "placeholder.json"
+        self.entities_file = entities_file
 
     @staticmethod
     def load_json_file(file_path):
@@ -40,15 +89,25 @@ class RMLMappingGenerator:
         """Load RDF relationships and entities from specified files."""
         self.rdf_relationships = self.load_json_file(self.rdf_relationship_file)
 
+    @staticmethod
+    def partition_source(relationship: dict):
+        """
+        Point the TriplesMap of a relationship to the in-memory source of its entity
+        type, or to the source with all entities if the iterator is not a type filter.
+        """
+        match = TYPE_ITERATOR_PATTERN.match(relationship.get('iterator', ''))
+        if match:
+            relationship['source'] = "{" + match.group(2) + "}"
+            relationship['iterator'] = "$[*]"
+        else:
+            relationship['source'] = "{" + ALL_ENTITIES_SOURCE + "}"
+
     @staticmethod
     def jinja2_rml_template():
         """
         Load Jinja based template of the RML Mapping file.
         """
-        template_dir = os.path.dirname(__file__)
-        env = Environment(loader=FileSystemLoader(template_dir))
-        template = env.get_template("iot_rml_template.ttl.jinja2")
-        return template
+        return load_rml_template()
 
     def create_mapping_file(self):
         """Generate RML Mapping file based on RDF relationships and entities."""
@@ -63,23 +122,145 @@ class RMLMappingGenerator:
                 relationship['iterator'] = (relationship['iterator'].replace("'", "TEMP_QUOTE").replace('"', "'").
                                             replace("TEMP_QUOTE", '"'))
 
+        # Logical source of each TriplesMap
+        for relationship in relationships:
+            relationship['source'] = os.path.basename(self.entities_file)
+            if self.partition_sources:
+                self.partition_source(relationship)
+
         # Jinja template definition
         mapping_template = self.jinja2_rml_template()
 
-        # Render template
-        mapping_content = mapping_template.render(
+        # Render template and stream it into the file
+        mapping_stream = mapping_template.generate(
             context=context,
             relationships=relationships,
-            entities_file=os.path.basename(self.entities_file)
+            entities_file=os.path.basename(self.entities_file),
+            join_free=self.join_free
         )
-
-        # Save file
         with open(self.output_file, 'w') as file:
-            file.write(mapping_content)
+            file.writelines(mapping_stream)
 
         print(f"RML Mapping file generated as '{self.output_file}'")
 
 
+
+def _generate_mapping(report: str, output: str, entities_file: str = None,
+                      partition_sources: bool = False, join_free: bool = False) -> str:
+    rml_generator = RMLMappingGenerator(
+        rdf_relationship_file=report,
+        output_file=output,
+        entities_file=entities_file,
+        partition_sources=partition_sources,
+        join_free=join_free
+    )
+    rml_generator.load_intermediate_reports()
+    rml_generator.create_mapping_file()
+    return output
+
+
+class RMLBatchGenerator:
+    def __init__(self, manifest, state_file: str = None):
+        """
+        Generate several RML Mapping files, e.g. for different ontologies or platforms,
+        with a single compilation of the template.
+
+        Args:
+            manifest: Path to a JSON manifest, or the list itself. Each entry is a dict
+                with "report", "output" and optionally "entities_file",
+                "partition_sources" and "join_free" (see RMLMappingGenerator), or a
+                tuple in the same order. Relative paths in a manifest file are resolved
+                against its directory.
+            state_file: JSON file that stores the content hashes of the inputs of each
+                output, to skip outputs whose inputs did not change. By default,
+                "<manifest>.state.json" next to a manifest file. Without a manifest
+                file and state file, all outputs are generated.
+        """
+        base_dir = None
+        if isinstance(manifest, (str, Path)):
+            base_dir = Path(manifest).parent
+            if state_file is None:
+                state_file = Path(manifest).with_suffix(".state.json")
+            with open(manifest, 'r') as file:
+                manifest = json.load(file)
+        self.jobs = [self._parse_entry(entry, base_dir) for entry in manifest]
+        self.state_file = state_file
+
+    @staticmethod
+    def _parse_entry(entry, base_dir: Path = None) -> tuple:
+        if isinstance(entry, dict):
+            entry = (entry["report"], entry["output"], entry.get("entities_file"),
+                     entry.get("partition_sources", False), entry.get("join_free", False))
+        report, output, entities_file, partition_sources, join_free = \
+            (tuple(entry) + (None, False, False))[:5]
+        if base_dir is not None:
+            report, output = str(base_dir / report), str(base_dir / output)
+        # only the base name of the entities file is written into the mapping
+        return report, output, entities_file, bool(partition_sources), bool(join_free)
+
+    @staticmethod
+    def input_hash(report: str, entities_file: str = None,
+                   partition_sources: bool = False, join_free: bool = False) -> str:
+        """Content hash of everything an output is generated from."""
+        digest = hashlib.sha256()
+        with open(report, 'rb') as file:
+            digest.update(file.read())
+        digest.update(os.path.basename(entities_file or "placeholder.json").encode())
+        digest.update(b"partitioned" if partition_sources else b"")
+        digest.update(b"join-free" if join_free else b"")
+        template = load_rml_template()
+        with open(template.filename, 'rb') as file:
+            digest.update(file.read())
+        return digest.hexdigest()
+
+    def _load_state(self) -> dict:
+        if self.state_file is None or not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file, 'r') as file:
+            return json.load(file)
+
+    def _save_state(self, state: dict):
+        if self.state_file is None:
+            return
+        with open(self.state_file, 'w') as file:
+            json.dump(state, file, indent=2)
+
+    def generate(self, max_workers: int = None, force: bool = False) -> list:
+        """
+        Generate the RML Mapping files of the manifest.
+
+        Args:
+            max_workers: Number of worker processes. None or 1 generates the files
+                sequentially in this process.
+            force: Generate all outputs, even if their inputs did not change.
+
+        Returns:
+            Paths of the generated outputs, skipped outputs are not included.
+        """
+        state = self._load_state()
+        jobs = []
+        hashes = {}
+        for job in self.jobs:
+            report, output, entities_file, partition_sources, join_free = job
+            inputs = self.input_hash(report, entities_file, partition_sources, join_free)
+            if not force and state.get(output) == inputs and os.path.exists(output):
+                print(f"RML Mapping file '{output}' is up to date, skipped")
+                continue
+            hashes[output] = inputs
+            jobs.append(job)
+
+        if max_workers is None or max_workers <= 1:
+            generated = [_generate_mapping(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_generate_mapping, *job) for job in jobs]
+                generated = [future.result() for future in futures]
+
+        state.update(hashes)
+        self._save_state(state)
+        return generated
+
+
 # if __name__ == '__main__':
 #
 #     # # Create a ResourceMonitor instance
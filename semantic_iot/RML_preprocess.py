@@ -2,12 +2,53 @@ import json
 import logging
 import os
 import time
-from typing import List, Any
+from typing import List, Any, Union
 from rapidfuzz import fuzz
 from rdflib import Graph, RDF, RDFS, OWL, SKOS, DC, URIRef
 from sentence_transformers import SentenceTransformer, util
 from semantic_iot.JSON_preprocess import JSONPreprocessorHandler
-from jsonpath_ng import parse
+from semantic_iot.utils.query import run_query, run_query_many
+from semantic_iot.utils.report import IntermediateReport, ReportItem
+from semantic_iot.utils.split_patterns import SplitPattern, key_paths
+from semantic_iot.utils.suggestion_cache import (DEFAULT_MAX_ENTRIES, SuggestionCache,
+                                                 ontology_digest, suggestion_key)
+
+
+# This SPARQL query looks for the SHACL pattern:
+# That Property Shape -> has sh:path -> The Property (what we want)
+# That Property Shape -> has sh:class -> The Object Class (our range)
+# it also includes checking superclasses using rdfs:subClassOf*
+# (The * means "zero or more times," so it includes the class itself)
+query_shacl_properties = """
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX sh: <http://www.w3.org/ns/shacl#>
+
+    SELECT DISTINCT ?property_iri
+    WHERE {
+        # ?subj is our input subject_iri (e.g., brick:VAV)
+        # Find any superclass of ?subj (e.g., brick:Equipment)
+        # where the property shape is defined.
+        ?subj rdfs:subClassOf* ?subj_shape_holder .
+        ?subj_shape_holder sh:property ?propShape .
+
+        # Get the property itself from the shape
+        ?propShape sh:path ?property_iri .
+
+        # Get the target class defined in the shape (e.g., brick:Point)
+        {
+            # Pattern 1: Range via sh:class
+            ?propShape sh:class ?target_class .
+        }
+        UNION
+        {
+            # Pattern 2: Range via sh:or list
+            ?propShape sh:or/rdf:rest*/rdf:first/sh:class ?target_class .
+        }
+
+        # Check if our ?obj is a subclass of that target_class
+        ?obj rdfs:subClassOf* ?target_class .
+    }
+"""
 
 
 class MappingPreprocess:
@@ -18,7 +59,9 @@ class MappingPreprocess:
                  platform_config: str = None,
                  similarity_mode: str = "string",  # ["string", "semantic"]
                  patterns_splitting: list = None,
-                 threshold_property: int = None
+                 threshold_property: int = None,
+                 suggestion_cache: Union[str, SuggestionCache] = None,
+                 suggestion_cache_size: int = DEFAULT_MAX_ENTRIES
                  ):
         """
         Preprocess the JSON data to create an "RDF node relationship" file in JSON-LD
@@ -44,6 +87,13 @@ class MappingPreprocess:
             patterns_splitting: List of patterns (JSONpath) to split a substructure of entities that
                 need to be processed as additional entities during KG generation.
             threshold_property: Threshold for property suggestion (in percentage).
+            suggestion_cache: Path of a persistent cache of the class and property
+                suggestions, or a SuggestionCache to share between processors. The
+                suggestions are reused for the same ontology, similarity mode, threshold,
+                keyword and subject/object classes. A cache opened from a path is
+                closed at the end of pre_process. By default, nothing is cached.
+            suggestion_cache_size: Maximum number of suggestions in the cache, the least
+                recently used ones are evicted.
         """
         self.json_file_path = json_file_path
         if not intermediate_report_file_path:
@@ -93,6 +143,13 @@ class MappingPreprocess:
 
         self.patterns_splitting = patterns_splitting if patterns_splitting else []
 
+        # persistent cache of terminology suggestions
+        self._owns_suggestion_cache = isinstance(suggestion_cache, (str, os.PathLike))
+        if self._owns_suggestion_cache:
+            suggestion_cache = SuggestionCache(suggestion_cache, suggestion_cache_size)
+        self.suggestion_cache = suggestion_cache
+        self.ontology_digest = None
+
     @staticmethod
     def get_value(entity, key):
         # Get the value of key
@@ -105,24 +162,11 @@ class MappingPreprocess:
         return value
 
     @staticmethod
-    def drop_duplicates(report_list: List[dict]):
+    def drop_duplicates(report: IntermediateReport) -> IntermediateReport:
         """
         Drop duplicated resource types in node relationship file.
         """
-        unique_node_types = set([item["nodetype"] for item in report_list])
-        unique_report_list = []
-        for unique_node_type in list(unique_node_types):
-            # find all items with the same nodetype
-            matched_items = [item for item in report_list if item["nodetype"] == unique_node_type]
-            if matched_items:
-                # get the first matched item
-                unique_report_list.append(matched_items[0])
-            # assert that all matched items are the same
-            if not all(d == matched_items[0] for d in matched_items):
-                logging.warning("Differences are found for the same resource type")
-                for d in matched_items:
-                    print(json.dumps(d, indent=2))
-        return unique_report_list
+        return report.drop_duplicates()
 
     def load_ontology(self):
         _graph = Graph(bind_namespaces="none")
@@ -131,6 +175,8 @@ class MappingPreprocess:
 
         # make ontology graph available
         self.ontology = _graph
+        if self.suggestion_cache is not None:
+            self.ontology_digest = ontology_digest(self.ontology_file_paths)
 
         # Extracting ontology classes
         ontology_classes = {}
@@ -267,6 +313,7 @@ class MappingPreprocess:
         suggestedProperties: dict[str, float] = {}
 
         # We iterate through all combinations of subjects and objects
+        pairs = []
         for s_iri, s_score in subjects.items():
             for o_iri, o_score in objects.items():
 
@@ -277,24 +324,29 @@ class MappingPreprocess:
                 #  Check if the average score meets the threshold
                 if avg_score < self.threshold_property:
                     continue
-
-                # FindProperties(pair.subject, pair.object)
-                # dynamic switch between SHACL and non-SHACL method
-                foundProps = self._find_properties(s_iri, o_iri)
-                foundProps.extend(self._find_properties_SH(s_iri, o_iri))
-
-                # if foundProps is empty then
-                if not foundProps:
-                    # continue
-                    continue
-
-                # Add foundProps to suggestedProperties
-                # We update the dictionary, keeping the *highest* score
-                # for any given property.
-                for prop_iri in foundProps:
-                    if (prop_iri not in suggestedProperties) or \
-                            (avg_score > suggestedProperties[prop_iri]):
-                        suggestedProperties[prop_iri] = avg_score
+                pairs.append((s_iri, o_iri, avg_score))
+
+        # the SHACL query is evaluated for all pairs in one batch
+        shacl_props = self._find_properties_SH_many([(s, o) for s, o, _ in pairs])
+
+        for (s_iri, o_iri, avg_score), pair_shacl_props in zip(pairs, shacl_props):
+            # FindProperties(pair.subject, pair.object)
+            # dynamic switch between SHACL and non-SHACL method
+            foundProps = self._find_properties(s_iri, o_iri)
+            foundProps.extend(pair_shacl_props)
+
+            # if foundProps is empty then
+            if not foundProps:
+                # continue
+                continue
+
+            # Add foundProps to suggestedProperties
+            # We update the dictionary, keeping the *highest* score
+            # for any given property.
+            for prop_iri in foundProps:
+                if (prop_iri not in suggestedProperties) or \
+                        (avg_score > suggestedProperties[prop_iri]):
+                    suggestedProperties[prop_iri] = avg_score
 
         # turn the dict to list of tuples in form of (iri, score)
         suggestedProperties_list = [(iri, score) for iri, score in suggestedProperties.items()]
@@ -344,48 +396,13 @@ class MappingPreprocess:
             print(f"Error: Invalid IRIs provided: {subject_iri}, {object_iri}. {e}")
             return []
 
-        # This SPARQL query looks for the SHACL pattern:
-        # That Property Shape -> has sh:path -> The Property (what we want)
-        # That Property Shape -> has sh:class -> The Object Class (our range)
-        # it also includes checking superclasses using rdfs:subClassOf*
-        # (The * means "zero or more times," so it includes the class itself)
-        query_str = """
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX sh: <http://www.w3.org/ns/shacl#>
-
-        SELECT DISTINCT ?property_iri
-        WHERE {
-            # ?subj is our input subject_iri (e.g., brick:VAV)
-            # Find any superclass of ?subj (e.g., brick:Equipment)
-            # where the property shape is defined.
-            ?subj rdfs:subClassOf* ?subj_shape_holder .
-            ?subj_shape_holder sh:property ?propShape .
-
-            # Get the property itself from the shape
-            ?propShape sh:path ?property_iri .
-
-            # Get the target class defined in the shape (e.g., brick:Point)
-            {
-                # Pattern 1: Range via sh:class
-                ?propShape sh:class ?target_class .
-            }
-            UNION
-            {
-                # Pattern 2: Range via sh:or list
-                ?propShape sh:or/rdf:rest*/rdf:first/sh:class ?target_class .
-            }
-
-            # Check if our ?obj is a subclass of that target_class
-            ?obj rdfs:subClassOf* ?target_class .
-        }
-        """
-
         connecting_properties = []
         try:
             # Execute the query, binding our function arguments to the variables
-            results = self.ontology.query(
-                query_str,
-                initBindings={
+            results = run_query(
+                self.ontology,
+                query_shacl_properties,
+                init_bindings={
                     'subj': subject_node,
                     'obj': object_node
                 }
@@ -404,6 +421,24 @@ class MappingPreprocess:
 
         return connecting_properties
 
+    def _find_properties_SH_many(self, pairs: List[tuple]) -> List[List[str]]:
+        """
+        Batched version of _find_properties_SH for a list of (subject_iri, object_iri)
+        pairs. The SHACL query is compiled once and evaluated for all pairs.
+
+        Returns a list of property IRIs (as strings) for each pair, in the same order.
+        """
+        try:
+            rows = run_query_many(
+                self.ontology,
+                query_shacl_properties,
+                [{'subj': URIRef(s_iri), 'obj': URIRef(o_iri)} for s_iri, o_iri in pairs]
+            )
+        except Exception:
+            # fall back to single queries, which report the failing pair
+            return [self._find_properties_SH(s_iri, o_iri) for s_iri, o_iri in pairs]
+        return [[str(row.property_iri) for row in pair_rows] for pair_rows in rows]
+
     def suggestion_condition_top_matches(self, n: int, mappings: List[tuple]) -> dict:
         """
         Suggest a class for the given entity type based on the ontology classes.
@@ -442,12 +477,31 @@ class MappingPreprocess:
         # If no prefix matches, return the original IRI
         return iri
 
+    def _cached_suggestion(self, kind: str, keyword: str, suggest,
+                           subjects: dict = None, objects: dict = None) -> dict:
+        """
+        Get the suggestion from the suggestion cache, or compute it with suggest() and
+        store it.
+        """
+        if self.suggestion_cache is None:
+            return suggest()
+        key = suggestion_key(kind, self.ontology_digest, self.similarity_mode,
+                             self.threshold_property, keyword, subjects, objects)
+        suggestion = self.suggestion_cache.get(key)
+        if suggestion is None:
+            suggestion = suggest()
+            self.suggestion_cache.put(key, suggestion)
+        return suggestion
+
     def suggest_class(self, entity_type):
         """
         Suggest a class for the given entity type based on the ontology classes.
         """
         keyword = entity_type.replace("_", " ")
+        return self._cached_suggestion("class", keyword,
+                                       lambda: self._suggest_class(keyword))
 
+    def _suggest_class(self, keyword: str) -> dict:
         # compute similarity scores for all ontology property classes
         if self.similarity_mode == "string":
             mappings = [(iri, self.string_similarity(keyword, label))
@@ -472,7 +526,13 @@ class MappingPreprocess:
         objects: dict of object classes with scores
         """
         keyword = attribute_path.replace("_", " ").replace(".", " ")
+        return self._cached_suggestion(
+            "property", keyword,
+            lambda: self._suggest_property_class(keyword, subjects, objects),
+            subjects=subjects, objects=objects)
 
+    def _suggest_property_class(self, keyword: str, subjects: dict = None,
+                                objects: dict = None) -> dict:
         property_classes = self.ontology_property_classes
 
         # compute similarity scores for all ontology property classes
@@ -596,141 +656,123 @@ class MappingPreprocess:
                 seen.add(relationship['related_type'])
         return unique_relationships
 
-    def append_extra_entities(self, report_list: List[dict]):
+    def append_extra_entities(self, report: IntermediateReport):
         """
-        Append extra entities to the report_list based on the patterns_splitting.
+        Append extra entities to the report based on the patterns_splitting.
+        Simple patterns ($..key, $.key1.key2) are evaluated once per entity type and
+        key index (see SplitPattern), other patterns once per entity with jsonpath-ng.
         """
+        patterns = [SplitPattern(pattern) for pattern in self.patterns_splitting]
+        report_items = list(report)
+        if any(pattern.structural for pattern in patterns):
+            # key index of each report item, computed once for all patterns
+            item_paths = [key_paths(report_item.entity) for report_item in report_items]
+        else:
+            item_paths = [None] * len(report_items)
+
         extra_items = []
-        for pattern in self.patterns_splitting:
-            jsonpath_expr = parse(pattern)
-            for report_item in report_list:
-                entity = report_item['entity']
-                # preserve the original entity in the new list
-                matches = jsonpath_expr.find(entity)
-                for match in matches:
-                    extra_type = f"{match.path.fields[0]}_{entity['type']}"
-                    extra_items.append(
-                        {
-                        "nodetype": extra_type,
-                        "iterator": f"$[?(@.type=='{entity['type']}')]",
-                        "class": None,
-                        "hasRelationship": [
-                            {
-                                "relatedNodeType": entity['type'],
-                                "propertyClass": None,
-                                "rawdataidentifier": "id"
-                            }
-                        ],
-                        "hasDataAccess": None
-                        }
-                    )
-                    report_item["hasRelationship"].append(
-                        {
-                            "relatedNodeType": extra_type,
-                            "propertyClass": None,
-                            "rawdataidentifier": "id"
-                        }
-                    )
-        # append the extra items to the report_list
-        report_list.extend(extra_items)
-
-
-    def initialize_report_list(self) -> List[dict]:
-        """
-        Initialize the report lists with the entities for mapping.
-        This function is used to populate the initial structure of the report lists.
-        """
-        report_list = []
+        for pattern in patterns:
+            # matched fields of each (entity type, key index)
+            matches_cache = {}
+            for report_item, paths in zip(report_items, item_paths):
+                entity = report_item.entity
+                if pattern.structural:
+                    key = (entity['type'], paths)
+                    if key not in matches_cache:
+                        matches_cache[key] = pattern.matched_fields(entity, paths)
+                    matched_fields = matches_cache[key]
+                else:
+                    matched_fields = pattern.matched_fields(entity)
+                for field in matched_fields:
+                    extra_type = f"{field}_{entity['type']}"
+                    extra_item = ReportItem(extra_type, entity_type=entity['type'])
+                    extra_item.add_relationship(entity['type'], "id")
+                    extra_items.append(extra_item)
+                    report_item.add_relationship(extra_type, "id")
+        # append the extra items to the report
+        report.extend(extra_items)
+
+    def initialize_report_list(self) -> IntermediateReport:
+        """
+        Initialize the report with the entities for mapping.
+        This function is used to populate the initial structure of the report.
+        """
+        report = IntermediateReport()
 
         # loop through the preprocessed entities
         for entity in self.entities_for_mapping:
             # find relationships
             relationships = self.find_relationships(entity, self.entities_for_mapping)
-            resource = {
-                "nodetype": entity['type'],
-                "iterator": f"$[?(@.type=='{entity['type']}')]",
-                "class": None,
-                "hasRelationship": [{"relatedNodeType": relationship["related_type"],
-                                     "propertyClass": None,
-                                     "rawdataidentifier": relationship["path"]}
-                                    for relationship in relationships],
-                "hasDataAccess": None,
-                # entity is only needed for internal usage
-                "entity": entity
-            }
-            report_list.append(resource)
-        return report_list
+            # entity is only needed for internal usage
+            resource = ReportItem(entity['type'], entity=entity)
+            for relationship in relationships:
+                resource.add_relationship(relationship["related_type"], relationship["path"])
+            report.add(resource)
+        return report
 
-    def terminology_mapping_subject(self, report_list: List[dict]) -> None:
+    def terminology_mapping_subject(self, report: IntermediateReport) -> None:
         """
-        Terminology mapping for subjects in the report lists.
+        Terminology mapping for subjects in the report.
         This function will suggest classes for the subjects based on the ontology.
         """
-        for resource in report_list:
-            resource_type = resource['nodetype']
-            suggested_class = self.suggest_class(resource_type)
-            resource["class"] = list(suggested_class.keys())
-            resource["class_with_score"] = suggested_class
+        for resource in report:
+            suggested_class = self.suggest_class(resource.nodetype)
+            resource.node_class = list(suggested_class.keys())
+            resource.class_with_score = suggested_class
 
-    def terminology_mapping_relationships(self, report_list: List[dict]) -> None:
+    def terminology_mapping_relationships(self, report: IntermediateReport) -> None:
         """
-        Terminology mapping for relationships in the report lists.
+        Terminology mapping for relationships in the report.
         This function will suggest property classes for the relationships based on the ontology.
         """
-        for resource in report_list:
-            subject_class_score = resource["class_with_score"]
-            for relationship in resource["hasRelationship"]:
-                object_type = relationship["relatedNodeType"]
-                # get the object class from the report_list, where resource['nodetype'] == object_type
-                object_class_score = next((r["class_with_score"] for r in report_list if r["nodetype"] == object_type), None)
+        for resource in report:
+            subject_class_score = resource.class_with_score
+            for relationship in resource.relationships:
+                object_type = relationship.related_node_type
+                # get the object class from the report, where resource.nodetype == object_type
+                object_resource = report.get(object_type)
+                object_class_score = object_resource.class_with_score if object_resource else None
                 if object_class_score is None:
                     logging.warning(f"Object class for related node type '{object_type}' not found. ")
-                attribute_path = relationship["rawdataidentifier"]
                 suggested_property_class = self.suggest_property_class(
-                    attribute_path,
+                    relationship.rawdataidentifier,
                     subjects=subject_class_score,
                     objects=object_class_score
                 )
-                relationship["propertyClass"] = list(suggested_property_class.keys())
+                relationship.property_class = list(suggested_property_class.keys())
 
-    def highlight_terminology_mapping(self, report_list: List[dict]) -> None:
+    def highlight_terminology_mapping(self, report: IntermediateReport) -> None:
         """
         Highlight the subject class and property class before output, which requires manual validation.
         This function will ensure that the subject class and property class are highlighted
-        in the report lists.
+        in the report.
         """
-        for resource in report_list:
-            subject_classes = resource["class"]
-            subject_classes = [self.convert_to_prefixed(s_c) for s_c in subject_classes]
-            resource["class"] = f"**TODO: PLEASE CHECK** {' '.join(subject_classes)}"
-            for relationship in resource["hasRelationship"]:
-                property_classes = relationship["propertyClass"]
-                property_classes = [self.convert_to_prefixed(p_c) for p_c in property_classes]
-                relationship["propertyClass"] = f"**TODO: PLEASE CHECK** {' '.join(property_classes)}"
+        for resource in report:
+            subject_classes = [self.convert_to_prefixed(s_c) for s_c in resource.node_class]
+            resource.node_class = f"**TODO: PLEASE CHECK** {' '.join(subject_classes)}"
+            for relationship in resource.relationships:
+                property_classes = [self.convert_to_prefixed(p_c)
+                                    for p_c in relationship.property_class]
+                relationship.property_class = f"**TODO: PLEASE CHECK** {' '.join(property_classes)}"
 
-    def clean_report(self, report_list: List[dict]) -> None:
+    def clean_report(self, report: IntermediateReport) -> None:
         """
-        Clean up the report lists by removing unused keys.
-        This function will remove the 'class_with_score' key from the report lists.
+        Clean up the report by dropping the data that is only needed for processing,
+        i.e. the scored class suggestions and the raw entities.
         """
-        for resource in report_list:
-            if 'class_with_score' in resource:
-                del resource['class_with_score']
-
-    def save_report(self, report_list: List[dict]) -> None:
-        """ Save the report lists to the RDF node relationship file in JSON-LD format."""
-        # drop the entity key from the report_list
-        for item in report_list:
-            if 'entity' in item:
-                del item['entity']
+        for resource in report:
+            resource.class_with_score = None
+            resource.entity = None
 
-        # sort the report_list by nodetype with alphabetical order
-        report_list.sort(key=lambda x: x['nodetype'].lower())
+    def save_report(self, report: IntermediateReport) -> None:
+        """ Save the report to the RDF node relationship file in JSON-LD format."""
+        # sort the report by nodetype with alphabetical order
+        report.sort()
 
         # add prefixes to the context
         context = self.ontology_prefixes
         # populate the report
-        json_ld_data = {"@context": context, "@data": report_list}
+        json_ld_data = {"@context": context, "@data": report.to_list()}
         # Save the preprocess file
         with open(self.intermediate_report_file_path, 'w') as preprocessed_file:
             json.dump(json_ld_data, preprocessed_file, indent=2)
@@ -750,31 +792,41 @@ class MappingPreprocess:
         # self.json_processor.preprocess_extra_entities()
         self.entities_for_mapping = self.json_processor.entities_for_mapping
 
-        # populate the report_list
-        report_list = self.initialize_report_list()
+        # populate the report
+        report = self.initialize_report_list()
 
         # handle the patterns for splitting
-        self.append_extra_entities(report_list)
+        self.append_extra_entities(report)
 
-        # drop duplicates from the report_list
-        report_list = self.drop_duplicates(report_list)
+        # drop duplicates from the report
+        report = self.drop_duplicates(report)
 
         # terminology mapping for subjects
-        self.terminology_mapping_subject(report_list)
+        self.terminology_mapping_subject(report)
 
         # terminology mapping for relationships
-        self.terminology_mapping_relationships(report_list)
+        self.terminology_mapping_relationships(report)
 
         # Highlight subject class and property class before output
-        self.highlight_terminology_mapping(report_list)
+        self.highlight_terminology_mapping(report)
 
         # Clean up, remove unused keys
-        self.clean_report(report_list)
+        self.clean_report(report)
 
         # output report lists
-        self.save_report(report_list)
+        self.save_report(report)
+
+        if self.suggestion_cache is not None:
+            stats = self.suggestion_cache.stats()
+            print(f"Suggestion cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['entries']} entries")
 
     def pre_process(self, **kwargs):
-        self.load_ontology()
-        self.create_intermediate_report_file(**kwargs)
+        try:
+            self.load_ontology()
+            self.create_intermediate_report_file(**kwargs)
+        finally:
+            # a cache shared by the caller stays open
+            if self._owns_suggestion_cache:
+                self.suggestion_cache.close()
 
@@ -1,7 +1,7 @@
-from .RML_generator import RMLMappingGenerator
+from .RML_generator import RMLMappingGenerator, RMLBatchGenerator
 from .RML_preprocess import MappingPreprocess
 from .RDF_generator import RDFGenerator
-from .API_postprocessor import  APIPostprocessor
+from .API_postprocessor import  APIPostprocessor, APIBatchPostprocessor
 
 
 __version__ = "0.3.0"
@@ -1,8 +1,10 @@
 """
 generate_fiware_openapi_spec.py
 
-From a Turtle KG of FIWARE entities/endpoints, emit a FIWARE-style OpenAPI 3.0.1 JSON spec
-with FIWARE headers only and generic operation metadata, preserving literal entity IDs in paths.
+From a Turtle, N-Triples or SQLite store (see utils.kg_store) KG of FIWARE entities/endpoints, emit a FIWARE-style OpenAPI 3.0.1 JSON spec
+with FIWARE headers only and generic operation metadata, preserving literal entity IDs in paths
+(or collapsing them into an {entityId} path parameter with --collapse-ids). The header parameters
+and the response are shared through the components section.
 """
 import os
 import re
@@ -12,6 +14,8 @@ from urllib.parse import urlparse
 from collections import OrderedDict
 import rdflib
 from rdflib.namespace import RDF
+from semantic_iot.utils.kg_store import load_graph
+from semantic_iot.utils.streaming import guess_format, iter_ntriples
 
 # Utility to extract the local name from a URI
 
@@ -25,23 +29,78 @@ def human_name(uri):
     path = parsed.path.rstrip('/')
     return path.split('/')[-1]
 
-# Build the OpenAPI spec from RDF
-
-def build_spec(rdf_path, server_url, title, version):
-    # Load the Turtle graph
-    g = rdflib.Graph()
-    g.parse(rdf_path, format="turtle")
+# Shared parameter objects, referenced from the operations via components.parameters
+
+FIWARE_PARAMETERS = OrderedDict([
+    ("ContentType", {"name": "Content-Type", "in": "header", "required": True, "schema": {"type": "string", "default": "text/plain"}}),
+    ("FiwareService", {"name": "Fiware-Service", "in": "header", "required": True, "schema": {"type": "string", "default": "semantic_iot"}}),
+    ("FiwareServicePath", {"name": "Fiware-ServicePath", "in": "header", "required": True, "schema": {"type": "string", "default": "/"}}),
+])
+
+# Path segments followed by an ID, and the name of the path parameter replacing the ID
+PATH_ID_PARAMETERS = {"entities": "entityId"}
+
+# Generic responses: 200 OK with plain text
+TEXT_RESPONSE = {"description": "Successful response.", "content": {"text/plain": {"schema": {"type": "string"}}}}
+
+
+def parameter_ref(name):
+    return {"$ref": f"#/components/parameters/{name}"}
+
+
+def path_template(path, collapse_ids=False):
+    """
+    Return (template, path parameter names) of a literal path. With collapse_ids,
+    the IDs following the segments in PATH_ID_PARAMETERS are replaced by path
+    parameters, e.g. /v2/entities/{entityId}/attrs/co2/value.
+    """
+    if not collapse_ids:
+        return path, []
+    segments = path.split("/")
+    path_params = []
+    for i in range(1, len(segments)):
+        param = PATH_ID_PARAMETERS.get(segments[i - 1])
+        if param and segments[i]:
+            segments[i] = "{" + param + "}"
+            path_params.append(param)
+    return "/".join(segments), path_params
+
+
+def request_method(subj, path):
+    """Determine HTTP method by simple heuristic."""
+    return "put" if "attrs" in path and path.endswith("/value") and "Setpoint" in subj else "get"
+
+
+def group_operations(access_points, type_of, collapse_ids=False):
+    """
+    Group the data access points by path template and HTTP method.
+
+    access_points: iterable of (subject, URL) from the rdf:value triples
+    type_of: function returning the class of a subject (or None)
+    Return: (server URL of the first http URL or None,
+             {template: (path parameter names, {method: tag})})
+    """
+    server_url = None
+    operations = OrderedDict()
+    for subj, raw_url in access_points:
+        raw_url = str(raw_url)
+        parsed = urlparse(raw_url)
+        if server_url is None and raw_url.startswith("http"):
+            server_url = f"{parsed.scheme}://{parsed.netloc}"
+
+        template, path_params = path_template(parsed.path, collapse_ids)
+        method = request_method(subj, parsed.path)
+        _, methods = operations.setdefault(template, (path_params, OrderedDict()))
+        # Avoid duplicates, the first subject of a (path, method) names the operation
+        if method in methods:
+            continue
+        cls = type_of(subj)
+        methods[method] = human_name(str(cls)) if cls else "Operation"
+    return server_url, operations
 
-    # Determine the server URL if not provided
-    if not server_url:
-        server_url = "/"
-        for _, _, val in g.triples((None, RDF.value, None)):
-            url = str(val)
-            if url.startswith("http"):
-                parts = urlparse(url)
-                server_url = f"{parts.scheme}://{parts.netloc}"
-                break
 
+def assemble_spec(operations, server_url, title, version):
+    """Build the OpenAPI document from the output of group_operations."""
     # Initialize OpenAPI skeleton
     spec = OrderedDict([
         ("openapi", "3.0.1"),
@@ -54,74 +113,131 @@ def build_spec(rdf_path, server_url, title, version):
         ("paths", OrderedDict())
     ])
 
-    seen = set()
+    used_parameters = set()
+    operation_ids = {}
+    for template, (path_params, methods) in operations.items():
+        path_item = OrderedDict()
+        if path_params:
+            path_item["parameters"] = [parameter_ref(p) for p in path_params]
+            used_parameters.update(path_params)
+        for method, tag in methods.items():
+            summary = f"{method.upper()} {tag}"
+
+            # FIWARE headers always
+            parameters = ["FiwareService", "FiwareServicePath"]
+            if method == "put":
+                parameters.insert(0, "ContentType")
+            used_parameters.update(parameters)
+
+            # operationIds must be unique, number repeated ones
+            operation_id = re.sub(r"\W+", "", summary)
+            count = operation_ids.get(operation_id, 0)
+            operation_ids[operation_id] = count + 1
+            if count:
+                operation_id = f"{operation_id}_{count}"
+
+            path_item[method] = OrderedDict([
+                ("tags", [tag]),
+                ("summary", summary),
+                ("operationId", operation_id),
+                ("parameters", [parameter_ref(p) for p in parameters]),
+                ("responses", {"200": {"$ref": "#/components/responses/TextResponse"}})
+            ])
+        spec["paths"][template] = path_item
+
+    # Add components section with the shared objects
+    components_parameters = OrderedDict(
+        (name, p) for name, p in FIWARE_PARAMETERS.items() if name in used_parameters)
+    for name in PATH_ID_PARAMETERS.values():
+        if name in used_parameters:
+            components_parameters[name] = {"name": name, "in": "path", "required": True, "schema": {"type": "string"}}
+    spec["components"] = OrderedDict([
+        ("parameters", components_parameters),
+        ("responses", {"TextResponse": TEXT_RESPONSE}),
+    ])
+    spec["x-original-swagger-version"] = "2.0"
 
-    # Iterate over each rdf:value triple
-    for subj, _, url_node in g.triples((None, RDF.value, None)):
-        raw_url = str(url_node)
-        parsed = urlparse(raw_url)
+    return spec
 
-        # Preserve literal path with entity IDs
-        path = parsed.path
+# Build the OpenAPI spec from RDF
 
-        # Determine HTTP method by simple heuristic
-        method = "put" if "attrs" in path and path.endswith("/value") and "Setpoint" in subj else "get"
+def build_spec(rdf_path, server_url, title, version, collapse_ids=False):
+    # N-Triples (optionally gzip compressed) are streamed instead of loaded
+    if guess_format(rdf_path) == "nt":
+        return build_spec_streaming(rdf_path, server_url, title, version, collapse_ids)
 
-        # Avoid duplicates
-        key = (path, method)
-        if key in seen:
-            continue
-        seen.add(key)
-
-        # Derive tag and summary from the subject's class or URI
-        cls = next(g.objects(subj, RDF.type), None)
-        tag = human_name(str(cls)) if cls else "Operation"
-        summary = f"{method.upper()} {tag}"
-
-        # Generic responses: 200 OK with plain text
-        responses = {"200": {"description": "Successful response.", "content": {"text/plain": {"schema": {"type": "string"}}}}}
-
-        # FIWARE headers always
-        parameters = [
-            {"name": "Fiware-Service",     "in": "header", "required": True, "schema": {"type": "string", "default": "semantic_iot"}},
-            {"name": "Fiware-ServicePath", "in": "header", "required": True, "schema": {"type": "string", "default": "/"}}
-        ]
-        if method == "put":
-            parameters.insert(0, {"name": "Content-Type", "in": "header", "required": True, "schema": {"type": "string", "default": "text/plain"}})
-
-        # Build operation object
-        op = OrderedDict([
-            ("tags", [tag]),
-            ("summary", summary),
-            ("operationId", re.sub(r"\W+", "", summary)),
-            ("parameters", parameters),
-            ("responses", responses)
-        ])
-
-        spec["paths"][path] = {method: op}
-
-    # Add components section
-    spec["components"] = {}
-    spec["x-original-swagger-version"] = "2.0"
+    # Load the Turtle graph, or open the SQLite store
+    g = load_graph(rdf_path)
 
-    return spec
+    # Look up the class of each subject only once
+    types = {}
+
+    def type_of(subj):
+        if subj not in types:
+            types[subj] = next(g.objects(subj, RDF.type), None)
+        return types[subj]
+
+    access_points = ((subj, url_node) for subj, _, url_node in g.triples((None, RDF.value, None)))
+    first_server_url, operations = group_operations(access_points, type_of, collapse_ids)
+
+    # Determine the server URL if not provided
+    if not server_url:
+        server_url = first_server_url or "/"
+
+    return assemble_spec(operations, server_url, title, version)
+
+def build_spec_streaming(rdf_path, server_url, title, version, collapse_ids=False):
+    """
+    Build the spec in two streaming passes over an N-Triples file (.nt or .nt.gz), so
+    memory usage grows with the number of distinct data access points rather than
+    with the size of the KG:
+        1) collect the distinct (URL, method) of the rdf:value triples with the first
+           subject of each,
+        2) look up the class of only these subjects.
+    """
+    # (URL, method) -> first subject, in the order of the file
+    access_points = OrderedDict()
+    for subj, pred, obj in iter_ntriples(rdf_path):
+        if pred == RDF.value:
+            url = str(obj)
+            access_points.setdefault((url, request_method(subj, urlparse(url).path)), subj)
+
+    subjects = set(access_points.values())
+    types = {}
+    if subjects:
+        for subj, pred, obj in iter_ntriples(rdf_path):
+            # like next(g.objects(subj, RDF.type)), keep the first class of a subject
+            if pred == RDF.type and subj in subjects and subj not in types:
+                types[subj] = obj
+                if len(types) == len(subjects):
+                    break
+
+    first_server_url, operations = group_operations(
+        ((subj, url) for (url, _), subj in access_points.items()), types.get, collapse_ids)
+    if not server_url:
+        server_url = first_server_url or "/"
+
+    return assemble_spec(operations, server_url, title, version)
 
 # CLI entry point
 
 def main():
-    parser = argparse.ArgumentParser(description="Generate FIWARE-style OpenAPI JSON from a Turtle KG")
-    parser.add_argument("--rdf",     required=True, help="Input Turtle file")
+    parser = argparse.ArgumentParser(description="Generate FIWARE-style OpenAPI JSON from a Turtle or N-Triples KG")
+    parser.add_argument("--rdf",     required=True, help="Input Turtle file, SQLite store (.sqlite, .db), or N-Triples file (.nt, .nt.gz) that is streamed")
     parser.add_argument("--title",   default="IoT Platform API Specification", help="API title")
     parser.add_argument("--version", default="1.0", help="API version")
     parser.add_argument("--server",  default=None, help="Server URL (optional)")
     parser.add_argument("--output",  required=True, help="Output JSON file or directory")
+    parser.add_argument("--collapse-ids", action="store_true",
+                        help="Replace entity IDs in paths by an {entityId} path parameter")
     args = parser.parse_args()
 
     # If directory, default file name
     if os.path.isdir(args.output):
         args.output = os.path.join(args.output, "openapi_fiware.json")
 
-    spec = build_spec(args.rdf, args.server, args.title, args.version)
+    spec = build_spec(args.rdf, args.server, args.title, args.version,
+                      collapse_ids=args.collapse_ids)
     with open(args.output, "w") as f:
         json.dump(spec, f, indent=2)
     print(f"Wrote FIWARE OpenAPI spec to {args.output}")
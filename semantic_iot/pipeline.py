@@ -0,0 +1,251 @@
+import errno
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, NamedTuple, Union
+from semantic_iot.API_postprocessor import APIPostprocessor
+from semantic_iot.RDF_generator import RDFGenerator
+from semantic_iot.RML_generator import RML_TEMPLATE_DIR, RML_TEMPLATE_NAME, RMLMappingGenerator
+from semantic_iot.utils.reasoning import inference_owlrl
+
+
+class Stage(NamedTuple):
+    """One step of the KGCP pipeline, producing one artifact file."""
+    name: str
+    suffix: str         # artifact file name suffix, e.g. "_extended.ttl"
+    run: Callable       # run(job: dict, upstream: Path, output: Path)
+    files: tuple = ()   # job keys of the input files, fingerprinted by content
+    options: tuple = ()  # job keys of the options, fingerprinted by value
+    kg: bool = False    # the artifact is a KG, saved into the SQLite store with "kg_store"
+    templates: tuple = ()  # paths of the templates the stage renders, fingerprinted by content
+
+
+def _run_rml(job: dict, upstream: Path, output: Path):
+    rml_generator = RMLMappingGenerator(
+        rdf_relationship_file=str(job["report"]),
+        output_file=str(output),
+        partition_sources=job.get("partition_sources", False),
+        join_free=job.get("join_free", False)
+    )
+    rml_generator.load_intermediate_reports()
+    rml_generator.create_mapping_file()
+
+
+def _run_rdf(job: dict, upstream: Path, output: Path):
+    rdf_gen = RDFGenerator(
+        mapping_file=str(upstream),
+        platform_config=str(job["platform_config"]),
+        partition_sources=job.get("partition_sources", False),
+        check_references=job.get("join_free", False),
+        preprocess_file=str(output.with_name("preprocessed.json"))
+    )
+    rdf_gen.generate_rdf(source_file=str(job["data"]), destination_file=str(output))
+
+
+def _run_http(job: dict, upstream: Path, output: Path):
+    postprocessor = APIPostprocessor(kg_path=upstream, api_spec_path=Path(job["api_spec"]))
+    postprocessor.extend_kg(share_parameters=job.get("share_parameters", False))
+    postprocessor.serialize(output)
+
+
+def _run_inference(job: dict, upstream: Path, output: Path):
+    # an absolute output file name is not joined with the directory of the KG
+    inference_owlrl(targ_kg_path=upstream, ontology_path=Path(job["ontology"]),
+                    output_filename=str(output.resolve()))
+
+
+# Stages in pipeline order, each one consumes the artifact of the previous one
+STAGES = OrderedDict((stage.name, stage) for stage in (
+    Stage("rml", "_rml.ttl", _run_rml, files=("report",),
+          options=("partition_sources", "join_free"),
+          templates=(os.path.join(RML_TEMPLATE_DIR, RML_TEMPLATE_NAME),)),
+    Stage("rdf", ".ttl", _run_rdf, files=("data", "platform_config"),
+          options=("partition_sources", "join_free"), kg=True),
+    Stage("http", "_extended.ttl", _run_http, files=("api_spec",),
+          options=("share_parameters",), kg=True),
+    Stage("inference", "_inferred.ttl", _run_inference, files=("ontology",), kg=True),
+))
+
+
+def register_stage(stage: Stage):
+    """Append a stage (e.g. the controller configuration of an application) to STAGES."""
+    STAGES[stage.name] = stage
+
+
+# content hashes of input files, keyed by (path, size, mtime)
+_file_digests = {}
+
+
+def file_digest(path: Union[Path, str]) -> str:
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _file_digests[key] = digest.hexdigest()
+    return _file_digests[key]
+
+
+def artifact_suffix(stage: Stage, job: dict) -> str:
+    """File name suffix of the artifact, ".sqlite" instead of ".ttl" for KGs in the store."""
+    if stage.kg and job.get("kg_store") and stage.suffix.endswith(".ttl"):
+        return stage.suffix[:-len(".ttl")] + ".sqlite"
+    return stage.suffix
+
+
+def stage_fingerprint(stage: Stage, job: dict, upstream_fingerprint: str = None) -> str:
+    """
+    Fingerprint of everything a stage output depends on: the stage, the content of
+    its input files and templates, its options and the fingerprint of the upstream
+    artifact. Like RMLBatchGenerator.input_hash, a changed RML template invalidates
+    the mapping files.
+    """
+    digest = hashlib.sha256(stage.name.encode())
+    for key in stage.files:
+        digest.update(f"\x00{key}\x00{file_digest(job[key])}".encode())
+    for template in stage.templates:
+        digest.update(f"\x00template\x00{file_digest(template)}".encode())
+    for key in stage.options:
+        digest.update(f"\x00{key}\x00{json.dumps(job.get(key))}".encode())
+    digest.update(f"\x00suffix\x00{artifact_suffix(stage, job)}".encode())
+    digest.update(f"\x00upstream\x00{upstream_fingerprint or ''}".encode())
+    return digest.hexdigest()
+
+
+def _publish_entry(tmp_dir: Path, entry_dir: Path, artifact: Path, replace: bool = False):
+    """
+    Move the artifact in tmp_dir into the cache entry entry_dir. A missing entry is
+    published with one atomic rename of tmp_dir. An existing entry (published by
+    another process with the same fingerprint) is kept, only its artifact file is
+    atomically replaced if replace is set or if the artifact is missing.
+    """
+    try:
+        os.rename(tmp_dir, entry_dir)
+        return
+    except OSError as e:
+        if e.errno not in (errno.EEXIST, errno.ENOTEMPTY) or not entry_dir.is_dir():
+            raise
+    if replace or not artifact.exists():
+        os.replace(tmp_dir / artifact.name, artifact)
+
+
+def run_pipeline(job: dict, stages: list, cache_dir: Union[Path, str],
+                 force: bool = False) -> dict:
+    """
+    Run the stages for one job (e.g. one hotel). A stage is skipped if the cache holds
+    the artifact of its fingerprint, otherwise it is run in a temporary directory
+    that is published into the cache with one atomic rename when the stage succeeded.
+    A published entry is never deleted, since other jobs may be reading it: if
+    another process published the same fingerprint meanwhile, its entry is reused.
+
+    Returns:
+        {stage name: artifact path}, with the artifacts copied into job["output_dir"]
+        if given.
+    """
+    cache_dir = Path(cache_dir)
+    name = job["name"]
+    artifacts = OrderedDict()
+    upstream, upstream_fingerprint = None, None
+    for stage in stages:
+        fingerprint = stage_fingerprint(stage, job, upstream_fingerprint)
+        entry_dir = cache_dir / stage.name / fingerprint[:16]
+        artifact = entry_dir / f"artifact{artifact_suffix(stage, job)}"
+
+        if artifact.exists() and not force:
+            print(f"[{name}] {stage.name}: up to date")
+        else:
+            print(f"[{name}] {stage.name}: running")
+            tmp_dir = cache_dir / stage.name / f"{fingerprint[:16]}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir(parents=True)
+            try:
+                stage.run(job, upstream, tmp_dir / artifact.name)
+                _publish_entry(tmp_dir, entry_dir, artifact, replace=force)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        artifacts[stage.name] = artifact
+        upstream, upstream_fingerprint = artifact, fingerprint
+
+    if job.get("output_dir"):
+        output_dir = Path(job["output_dir"])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for stage in stages:
+            exported = output_dir / f"{name}{artifact_suffix(stage, job)}"
+            shutil.copyfile(artifacts[stage.name], exported)
+            artifacts[stage.name] = exported
+    return artifacts
+
+
+class PipelineRunner:
+    def __init__(self, manifest: Union[Path, str, dict], cache_dir: Union[Path, str] = None):
+        """
+        Run the KGCP pipeline (RML mapping, RDF generation, HTTP extension, inference,
+        and registered stages) for several hotels from a declarative manifest. The
+        manual validation of the intermediate report is not part of the pipeline, it
+        starts from the validated report.
+
+        Args:
+            manifest: Path to a JSON manifest, or the manifest itself:
+                {
+                  "cache_dir": "cache",
+                  "stages": ["rml", "rdf", "http", "inference"],
+                  "defaults": {"report": ..., "platform_config": ..., "api_spec": ...,
+                               "ontology": ..., "output_dir": ...},
+                  "hotels": [{"name": "hotel_10rooms", "data": "hotel_10rooms.json"}]
+                }
+                Each hotel entry is merged with the defaults. Relative paths in a
+                manifest file are resolved against its directory. With "kg_store": true,
+                the KGs are passed between the stages as SQLite stores (see
+                utils.kg_store) instead of Turtle files.
+            cache_dir: Directory of the artifact cache, overrides "cache_dir" of the
+                manifest. By default, ".pipeline_cache" next to the manifest.
+        """
+        base_dir = Path.cwd()
+        if not isinstance(manifest, dict):
+            base_dir = Path(manifest).parent
+            with open(manifest, "r") as f:
+                manifest = json.load(f)
+
+        self.stages = [STAGES[name] for name in manifest.get("stages", list(STAGES))]
+        self.cache_dir = Path(cache_dir or base_dir / manifest.get("cache_dir", ".pipeline_cache"))
+        path_keys = {key for stage in self.stages for key in stage.files} | {"output_dir"}
+
+        self.jobs = []
+        for hotel in manifest["hotels"]:
+            job = {**manifest.get("defaults", {}), **hotel}
+            for key in path_keys:
+                if job.get(key) is not None:
+                    job[key] = base_dir / job[key]
+            self.jobs.append(job)
+
+    def run(self, max_workers: int = None, force: bool = False) -> dict:
+        """
+        Run the pipeline of each hotel, independent hotels in parallel.
+
+        Args:
+            max_workers: Number of worker processes. None or 1 runs the hotels
+                sequentially in this process.
+            force: Rerun all stages, even if their inputs did not change.
+
+        Returns:
+            {hotel name: {stage name: artifact path}}
+        """
+        if max_workers is None or max_workers <= 1:
+            results = [run_pipeline(job, self.stages, self.cache_dir, force)
+                       for job in self.jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(run_pipeline, job, self.stages,
+                                           self.cache_dir, force)
+                           for job in self.jobs]
+                results = [future.result() for future in futures]
+        return OrderedDict((job["name"], artifacts)
+                           for job, artifacts in zip(self.jobs, results))
@@ -0,0 +1,88 @@
+import json
+from collections import deque
+from pathlib import Path
+from typing import Iterable, Union
+import rdflib
+from rdflib import URIRef
+from rdflib.namespace import RDF
+
+BRICK = rdflib.Namespace("https://brickschema.org/schema/Brick#")
+REC = rdflib.Namespace("https://w3id.org/rec#")
+
+# Edges followed by (brick:isPointOf|brick:hasLocation|brick:isPartOf)*
+CONTAINMENT_PREDICATES = (BRICK.isPointOf, BRICK.hasLocation, BRICK.isPartOf)
+
+
+class ContainmentIndex:
+    """
+    Transitive closure of point/location/part-of edges in a KG. Maps each node to the
+    set of containers (e.g. rooms) that contain it, which answers the SPARQL pattern
+    "?node (brick:isPointOf|brick:hasLocation|brick:isPartOf)* ?room" from a dictionary.
+    As for the zero-or-more path, a container also contains itself.
+    """
+    def __init__(self, containers: dict = None):
+        """
+        Args:
+            containers: {node: set of containers}. Use from_graph or load to create it.
+        """
+        self.containers = containers or {}
+        self._members = None
+
+    @classmethod
+    def from_graph(cls,
+                   graph: rdflib.Graph,
+                   container_class: URIRef = REC.Room,
+                   predicates: Iterable[URIRef] = CONTAINMENT_PREDICATES
+                   ) -> "ContainmentIndex":
+        """
+        Build the index in one pass over the containment edges of the graph, followed
+        by a backward traversal from each container.
+        """
+        # reverse adjacency: target -> nodes pointing to it
+        contained_in = {}
+        for predicate in predicates:
+            for s, o in graph.subject_objects(predicate):
+                contained_in.setdefault(o, set()).add(s)
+
+        containers = {}
+        for container in set(graph.subjects(RDF.type, container_class)):
+            # every node reached backwards from the container is contained in it
+            visited = {container}
+            queue = deque([container])
+            while queue:
+                node = queue.popleft()
+                containers.setdefault(node, set()).add(container)
+                for child in contained_in.get(node, ()):
+                    if child not in visited:
+                        visited.add(child)
+                        queue.append(child)
+        return cls(containers)
+
+    def containers_of(self, node) -> set:
+        """Containers (e.g. rooms) containing the node, directly or transitively."""
+        return self.containers.get(node, set())
+
+    def members_of(self, container) -> set:
+        """Nodes contained in the container, directly or transitively."""
+        if self._members is None:
+            members = {}
+            for node, node_containers in self.containers.items():
+                for c in node_containers:
+                    members.setdefault(c, set()).add(node)
+            self._members = members
+        return self._members.get(container, set())
+
+    def save(self, path: Union[Path, str]):
+        """Save the index as JSON, e.g. next to the KG it was built from."""
+        data = {str(node): sorted(str(c) for c in node_containers)
+                for node, node_containers in self.containers.items()
+                if isinstance(node, URIRef)}
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: Union[Path, str]) -> "ContainmentIndex":
+        with open(path, "r") as f:
+            data = json.load(f)
+        return cls({URIRef(node): {URIRef(c) for c in node_containers}
+                    for node, node_containers in data.items()})
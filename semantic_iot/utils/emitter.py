@@ -0,0 +1,102 @@
+import json
+import os
+from pathlib import Path
+from typing import Union
+import yaml
+
+# use the C accelerated dumper of libyaml if PyYAML was built with it
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+FORMATS = ("yaml", "jsonl")
+
+
+def guess_record_format(path: Union[Path, str]) -> str:
+    """Guess the record format ("jsonl" or "yaml") from the file name."""
+    return "jsonl" if Path(path).suffix in (".jsonl", ".ndjson") else "yaml"
+
+
+class RecordEmitter:
+    """
+    Write records (e.g. controller configuration entries) one at a time, either as
+    YAML documents ("---" separated) or as JSON Lines. Each record is flushed when it
+    is written, so that consumers can read the file while it grows.
+
+    After a unit of work (e.g. a room) is completed, checkpoint(key) records the key
+    and the size of the output in "<output>.progress". An emitter opened with
+    resume=True truncates the output to the last checkpoint and reports its key in
+    last_key, so that the producer can continue after it. The progress file is
+    removed when the emitter is closed after a complete run.
+    """
+    def __init__(self, output_path: Union[Path, str], record_format: str = None,
+                 resume: bool = False):
+        """
+        Args:
+            output_path: File the records are written to.
+            record_format: "yaml" or "jsonl". Guessed from the file name if None.
+            resume: Continue after the last checkpoint of a previous, incomplete run.
+                Starts from scratch if there is no checkpoint.
+        """
+        self.output_path = Path(output_path)
+        self.record_format = record_format or guess_record_format(self.output_path)
+        if self.record_format not in FORMATS:
+            raise ValueError(f"Unsupported record format: {self.record_format}. "
+                             f"Use one of {FORMATS}.")
+        self.progress_path = self.output_path.with_name(self.output_path.name + ".progress")
+        self.last_key = None
+        self.count = 0
+
+        os.makedirs(self.output_path.parent, exist_ok=True)
+        progress = self._read_progress() if resume and self.output_path.exists() else None
+        if progress is not None:
+            self.last_key = progress["key"]
+            self.count = progress["count"]
+            self.stream = open(self.output_path, "r+", encoding="utf-8")
+            self.stream.truncate(progress["offset"])
+            self.stream.seek(progress["offset"])
+        else:
+            self.stream = open(self.output_path, "w", encoding="utf-8")
+            if self.progress_path.exists():
+                self.progress_path.unlink()
+
+    def _read_progress(self) -> Union[dict, None]:
+        if not self.progress_path.exists():
+            return None
+        with open(self.progress_path, "r") as f:
+            return json.load(f)
+
+    def write(self, record: dict):
+        if self.record_format == "jsonl":
+            self.stream.write(json.dumps(record) + "\n")
+        else:
+            yaml.dump(record, self.stream, Dumper=SafeDumper, sort_keys=False,
+                      explicit_start=True)
+        self.stream.flush()
+        self.count += 1
+
+    def checkpoint(self, key: str):
+        """Mark everything written so far as complete up to (and including) key."""
+        self.stream.flush()
+        tmp_path = self.progress_path.with_name(self.progress_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"key": key, "offset": self.stream.tell(), "count": self.count}, f)
+        os.replace(tmp_path, self.progress_path)
+        self.last_key = key
+
+    def close(self, complete: bool = True):
+        """
+        Args:
+            complete: The run is finished, the progress file is removed. Otherwise it
+                is kept to resume from the last checkpoint.
+        """
+        self.stream.close()
+        if complete and self.progress_path.exists():
+            self.progress_path.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(complete=exc_type is None)
@@ -0,0 +1,100 @@
+import json
+from pathlib import Path
+from typing import List, NamedTuple, Union
+import rdflib
+from rdflib.namespace import RDF
+
+HTTP = rdflib.Namespace("http://www.w3.org/2011/http#")
+
+
+class HttpRequest(NamedTuple):
+    """http:Request of an extended KG with its headers and params already resolved."""
+    request_node: str
+    method: str
+    url: str
+    path: str
+    authority: str
+    headers: dict   # {fieldName: fieldValue}, sorted by name
+    params: dict    # {paramName: paramValue}, sorted by name
+
+
+class HttpRequestIndex:
+    """
+    Index of the HTTP metadata added by the APIPostprocessor, mapping
+    (absoluteURI, method) to an HttpRequest. Replaces per-request SPARQL lookups
+    by dictionary lookups.
+    """
+    def __init__(self, requests: dict = None):
+        """
+        Args:
+            requests: {(absoluteURI, lower case method): HttpRequest}. Use from_graph
+                or load to create it.
+        """
+        self.requests = requests or {}
+
+    @staticmethod
+    def _fields(graph: rdflib.Graph, req, link, name_predicate, value_predicate) -> dict:
+        fields = []
+        for node in graph.objects(req, link):
+            for name in graph.objects(node, name_predicate):
+                for value in graph.objects(node, value_predicate):
+                    fields.append((str(name), str(value)))
+        return dict(sorted(fields, key=lambda field: field[0]))
+
+    @classmethod
+    def from_graph(cls, graph: rdflib.Graph) -> "HttpRequestIndex":
+        """Build the index in one pass over all http:Request nodes of the graph."""
+        requests = {}
+        for req in graph.subjects(RDF.type, HTTP.Request):
+            method = graph.value(req, HTTP.methodName)
+            abs_uri = graph.value(req, HTTP.absoluteURI)
+            if method is None or abs_uri is None:
+                continue
+            path = graph.value(req, HTTP.absolutePath)
+            authority = graph.value(req, HTTP.authority)
+            key = (str(abs_uri), str(method).lower())
+            # keep the first request found for a URI and method
+            requests.setdefault(key, HttpRequest(
+                request_node=str(req),
+                method=str(method),
+                url=str(abs_uri),
+                path=str(path) if path is not None else None,
+                authority=str(authority) if authority is not None else None,
+                headers=cls._fields(graph, req, HTTP.headers,
+                                    HTTP.fieldName, HTTP.fieldValue),
+                params=cls._fields(graph, req, HTTP.params,
+                                   HTTP.paramName, HTTP.paramValue),
+            ))
+        return cls(requests)
+
+    def get(self, abs_uri, method: str) -> Union[HttpRequest, None]:
+        """Request for the absolute URI and method (case-insensitive), or None."""
+        return self.requests.get((str(abs_uri), method.lower()))
+
+    def resolve(self, abs_uri, methods: Union[str, List[str]]) -> Union[HttpRequest, None]:
+        """First request found for the absolute URI, trying the methods in order."""
+        if isinstance(methods, str):
+            methods = [methods]
+        for method in methods:
+            request = self.get(abs_uri, method)
+            if request is not None:
+                return request
+        return None
+
+    def __len__(self):
+        return len(self.requests)
+
+    def save(self, path: Union[Path, str]):
+        """Save the index as JSON, e.g. for runtime clients without an RDF stack."""
+        with open(path, "w") as f:
+            json.dump([request._asdict() for request in self.requests.values()], f)
+
+    @classmethod
+    def load(cls, path: Union[Path, str]) -> "HttpRequestIndex":
+        with open(path, "r") as f:
+            data = json.load(f)
+        requests = {}
+        for item in data:
+            request = HttpRequest(**item)
+            requests.setdefault((request.url, request.method.lower()), request)
+        return cls(requests)
@@ -0,0 +1,301 @@
+import os
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Union
+import rdflib
+from rdflib import BNode, Literal, URIRef
+from rdflib.store import NO_STORE, VALID_STORE, Store
+from rdflib.util import guess_format
+
+# File suffixes of KGs in the SQLite store, all other files are parsed as Turtle
+KG_STORE_SUFFIXES = (".sqlite", ".db")
+
+# term kinds in the terms table
+_URI, _BNODE, _LITERAL = 0, 1, 2
+
+# number of terms kept in memory by each store, the least recently used are dropped
+TERM_CACHE_SIZE = 100000
+# number of rows fetched at a time when iterating over the triples of a pattern
+FETCH_SIZE = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    datatype TEXT NOT NULL DEFAULT '',
+    lang TEXT NOT NULL DEFAULT '',
+    UNIQUE (kind, value, datatype, lang)
+);
+CREATE TABLE IF NOT EXISTS triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri TEXT NOT NULL
+);
+"""
+
+
+def is_kg_store(path: Union[Path, str]) -> bool:
+    """A KG path refers to the SQLite store if it has one of the KG_STORE_SUFFIXES."""
+    return Path(path).suffix in KG_STORE_SUFFIXES
+
+
+def _encode(term) -> tuple:
+    if isinstance(term, Literal):
+        return (_LITERAL, str(term), str(term.datatype or ""), term.language or "")
+    if isinstance(term, BNode):
+        return (_BNODE, str(term), "", "")
+    return (_URI, str(term), "", "")
+
+
+def _decode(kind: int, value: str, datatype: str, lang: str):
+    if kind == _LITERAL:
+        return Literal(value, lang=lang or None,
+                       datatype=URIRef(datatype) if datatype else None)
+    if kind == _BNODE:
+        return BNode(value)
+    return URIRef(value)
+
+
+class SQLiteStore(Store):
+    """
+    rdflib store that keeps the triples of a KG in a SQLite file. The terms are stored
+    once in a dictionary table and the triples as term ids, indexed in SPO, POS and OSP
+    order, so that every triple pattern is answered from an index. Opening the store
+    does not read the triples, which makes it the fast alternative to parsing a large
+    Turtle file in each stage. Matching triples are read in chunks, and only the
+    TERM_CACHE_SIZE most recently used terms are kept in memory.
+
+    Use it through load_graph and save_graph, or as rdflib.Graph(store=SQLiteStore()).
+    """
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration: str = None, identifier=None,
+                 read_only: bool = False):
+        """
+        Args:
+            configuration: Path to the SQLite file. If given, the store is opened.
+            identifier: See rdflib.store.Store.
+            read_only: Open the file read-only, e.g. for the stages after RDFGenerator.
+        """
+        self.read_only = read_only
+        self.connection = None
+        # LRU caches of the term dictionary, term -> id and id -> term
+        self._ids = OrderedDict()
+        self._terms = OrderedDict()
+        super().__init__(configuration, identifier)
+
+    def open(self, configuration: str, create: bool = False):
+        path = Path(configuration)
+        if not path.exists() and (self.read_only or not create):
+            return NO_STORE
+        if self.read_only:
+            self.connection = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro",
+                                              uri=True, check_same_thread=False)
+        else:
+            self.connection = sqlite3.connect(str(path), check_same_thread=False)
+            self.connection.executescript(_SCHEMA)
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = False):
+        if self.connection is not None:
+            if not self.read_only:
+                self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    # ---------- term dictionary ----------
+    def _cache_term(self, term, term_id: int):
+        self._ids[term] = term_id
+        self._terms[term_id] = term
+        if len(self._ids) > TERM_CACHE_SIZE:
+            self._ids.popitem(last=False)
+        if len(self._terms) > TERM_CACHE_SIZE:
+            self._terms.popitem(last=False)
+
+    def _term_id(self, term, create: bool = False):
+        term_id = self._ids.get(term)
+        if term_id is not None:
+            self._ids.move_to_end(term)
+            return term_id
+        key = _encode(term)
+        row = self.connection.execute(
+            "SELECT id FROM terms WHERE kind=? AND value=? AND datatype=? AND lang=?",
+            key).fetchone()
+        if row is not None:
+            term_id = row[0]
+        elif create:
+            term_id = self.connection.execute(
+                "INSERT INTO terms (kind, value, datatype, lang) VALUES (?, ?, ?, ?)",
+                key).lastrowid
+        else:
+            return None
+        self._cache_term(term, term_id)
+        return term_id
+
+    def _term(self, term_id: int):
+        term = self._terms.get(term_id)
+        if term is not None:
+            self._terms.move_to_end(term_id)
+            return term
+        row = self.connection.execute(
+            "SELECT kind, value, datatype, lang FROM terms WHERE id=?",
+            (term_id,)).fetchone()
+        term = _decode(*row)
+        self._cache_term(term, term_id)
+        return term
+
+    # ---------- triples ----------
+    def add(self, triple, context=None, quoted: bool = False):
+        Store.add(self, triple, context, quoted)
+        ids = tuple(self._term_id(term, create=True) for term in triple)
+        self.connection.execute("INSERT OR IGNORE INTO triples VALUES (?, ?, ?)", ids)
+
+    def addN(self, quads: Iterable[tuple]):
+        self.add_triples((s, p, o) for s, p, o, _ in quads)
+
+    def add_triples(self, triples: Iterable[tuple]):
+        """Bulk insert of triples, much faster than adding them one at a time."""
+        rows = (tuple(self._term_id(term, create=True) for term in triple)
+                for triple in triples)
+        self.connection.executemany("INSERT OR IGNORE INTO triples VALUES (?, ?, ?)", rows)
+
+    def _where(self, triple_pattern) -> Union[tuple, None]:
+        """WHERE clause and parameters of a pattern, None if a term is not stored."""
+        conditions, params = [], []
+        for column, term in zip("spo", triple_pattern):
+            if term is None:
+                continue
+            term_id = self._term_id(term)
+            if term_id is None:
+                return None
+            conditions.append(f"{column}=?")
+            params.append(term_id)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where, params
+
+    def remove(self, triple_pattern, context=None):
+        Store.remove(self, triple_pattern, context)
+        where = self._where(triple_pattern)
+        if where is not None:
+            self.connection.execute("DELETE FROM triples" + where[0], where[1])
+
+    def triples(self, triple_pattern, context=None):
+        where = self._where(triple_pattern)
+        if where is None:
+            return
+        term = self._term
+        # own cursor, the term lookups run on the connection in between the chunks
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT s, p, o FROM triples" + where[0], where[1])
+            rows = cursor.fetchmany(FETCH_SIZE)
+            while rows:
+                for s, p, o in rows:
+                    yield (term(s), term(p), term(o)), iter(())
+                rows = cursor.fetchmany(FETCH_SIZE)
+        finally:
+            cursor.close()
+
+    def __len__(self, context=None) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # ---------- namespaces ----------
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True):
+        if self.read_only:
+            return
+        if not override and self.namespace(prefix) is not None:
+            return
+        self.connection.execute("DELETE FROM namespaces WHERE uri=?", (str(namespace),))
+        self.connection.execute("INSERT OR REPLACE INTO namespaces VALUES (?, ?)",
+                                (prefix, str(namespace)))
+
+    def namespace(self, prefix: str):
+        row = self.connection.execute("SELECT uri FROM namespaces WHERE prefix=?",
+                                      (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace: URIRef):
+        row = self.connection.execute("SELECT prefix FROM namespaces WHERE uri=?",
+                                      (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        for prefix, uri in self.connection.execute(
+                "SELECT prefix, uri FROM namespaces").fetchall():
+            yield prefix, URIRef(uri)
+
+
+def save_graph(graph: rdflib.Graph, destination: Union[Path, str]):
+    """
+    Save a graph as Turtle, or into a new SQLite store if the destination has one of
+    the KG_STORE_SUFFIXES. An existing store file is replaced.
+    """
+    if not is_kg_store(destination):
+        graph.serialize(destination=str(destination), format="turtle")
+        return
+    tmp_path = Path(str(destination) + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    store = SQLiteStore()
+    store.open(str(tmp_path), create=True)
+    for prefix, namespace in graph.namespaces():
+        store.bind(prefix, namespace)
+    store.add_triples(graph)
+    store.close()
+    os.replace(tmp_path, destination)
+
+
+def load_graph(path: Union[Path, str], in_memory: bool = False) -> rdflib.Graph:
+    """
+    Open a KG. A SQLite store is opened read-only without loading the triples, other
+    files are parsed in the format guessed from their name (Turtle, N-Triples,
+    JSON-LD, RDF/XML, ...).
+
+    Args:
+        path: Path to the SQLite store or the RDF file.
+        in_memory: Copy the triples of a store into an in-memory graph, for stages
+            that modify the KG.
+    """
+    if not is_kg_store(path):
+        # rdflib falls back to Turtle if the format cannot be guessed
+        return rdflib.Graph().parse(str(path), format=guess_format(str(path)))
+    store = SQLiteStore(read_only=True)
+    if store.open(str(path)) != VALID_STORE:
+        raise FileNotFoundError(f"KG store not found: {path}")
+    graph = rdflib.Graph(store=store)
+    if not in_memory:
+        return graph
+    memory_graph = rdflib.Graph()
+    for prefix, namespace in graph.namespaces():
+        memory_graph.bind(prefix, namespace)
+    memory_graph.addN((s, p, o, memory_graph) for s, p, o in graph)
+    store.close()
+    return memory_graph
+
+
+def export_turtle(store_path: Union[Path, str], destination: Union[Path, str]):
+    """Export the KG of a SQLite store as Turtle."""
+    graph = load_graph(store_path)
+    graph.serialize(destination=str(destination), format="turtle")
+    graph.close()
@@ -0,0 +1,129 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import Retry
+
+# Maximum page size of Orion
+NGSI_MAX_LIMIT = 1000
+
+
+def pooled_session(pool_size: int, allowed_methods: tuple = ("GET",)) -> requests.Session:
+    """
+    Session with a connection pool of pool_size connections, for concurrent requests,
+    that retries requests of allowed_methods on 429 and 5xx responses.
+    """
+    retry_strategy = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=list(allowed_methods),
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                          max_retries=retry_strategy)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class NGSIv2Source:
+    """
+    Read all entities of an NGSI-v2 context broker (e.g. Orion) page by page from
+    /v2/entities with limit/offset. The first page also returns the total count
+    (options=count), after which the remaining pages are requested concurrently over
+    one pooled session. If the broker (or a proxy) drops the Fiware-Total-Count
+    header, the pages are requested one after the other until a short page arrives.
+    Pages are yielded in order as soon as they arrive, so the entities can be passed
+    to JSONPreprocessor.load_entities or RDFGenerator.generate_rdf_from_entities
+    without exporting them to a file.
+    """
+    def __init__(self,
+                 url: str,
+                 service: str = None,
+                 service_path: str = "/",
+                 limit: int = NGSI_MAX_LIMIT,
+                 max_workers: int = 4,
+                 params: dict = None,
+                 session: requests.Session = None,
+                 timeout: float = 30):
+        """
+        Args:
+            url: Base URL of the context broker, e.g. "http://localhost:1026".
+            service: Fiware-Service (tenant). None for the default tenant.
+            service_path: Fiware-ServicePath, e.g. "/" or "/hotel".
+            limit: Page size, at most 1000 for Orion.
+            max_workers: Number of pages requested at the same time.
+            params: Additional query parameters of /v2/entities, e.g. {"type": "Hotel"}
+                or {"options": "keyValues"}. By default, the entities are read in the
+                normalized format, as exported by filip's get_entity_list().
+            session: Session to reuse. By default, a session with a connection pool of
+                max_workers connections and retries on 429 and 5xx responses is used.
+            timeout: Timeout of each request in seconds.
+        """
+        if not 0 < limit <= NGSI_MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {NGSI_MAX_LIMIT}, got {limit}")
+        self.url = url.rstrip("/") + "/v2/entities"
+        self.limit = limit
+        self.max_workers = max(1, max_workers)
+        self.params = dict(params or {})
+        self.timeout = timeout
+        self.headers = {"Fiware-ServicePath": service_path}
+        if service:
+            self.headers["Fiware-Service"] = service
+        self.session = session or pooled_session(self.max_workers)
+        self.total_count = None
+
+    def get_page(self, offset: int, count: bool = False) -> List[dict]:
+        """Request the page of entities starting at offset."""
+        params = {**self.params, "limit": self.limit, "offset": offset}
+        if count:
+            options = [o for o in params.get("options", "").split(",") if o]
+            params["options"] = ",".join(options + ["count"])
+        response = self.session.get(self.url, params=params, headers=self.headers,
+                                    timeout=self.timeout)
+        response.raise_for_status()
+        if count:
+            total_count = response.headers.get("Fiware-Total-Count")
+            self.total_count = int(total_count) if total_count is not None else None
+        return response.json()
+
+    def iter_pages(self) -> Iterator[List[dict]]:
+        """Yield the pages of entities in order."""
+        first_page = self.get_page(0, count=True)
+        yield first_page
+        if self.total_count is None:
+            # the total count is unknown, page sequentially until a short page
+            page, offset = first_page, 0
+            while len(page) >= self.limit:
+                offset += self.limit
+                page = self.get_page(offset)
+                if page:
+                    yield page
+            return
+        offsets = deque(range(self.limit, self.total_count, self.limit))
+        if not offsets:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # at most two pages per worker are requested ahead of the consumer
+            pending = deque()
+            while offsets or pending:
+                while offsets and len(pending) < 2 * self.max_workers:
+                    pending.append(executor.submit(self.get_page, offsets.popleft()))
+                yield pending.popleft().result()
+
+    def iter_entities(self) -> Iterator[dict]:
+        """Yield all entities, page by page."""
+        for page in self.iter_pages():
+            yield from page
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
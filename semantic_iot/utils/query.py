@@ -0,0 +1,44 @@
+from functools import lru_cache
+from typing import Iterable, List
+import rdflib
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.sparql import Query
+
+
+@lru_cache(maxsize=256)
+def _prepare(query: str, init_ns: tuple) -> Query:
+    return prepareQuery(query, initNs=dict(init_ns))
+
+
+def prepare(query: str, init_ns: dict = None) -> Query:
+    """
+    Parse and translate a SPARQL query once. The compiled algebra is cached by query
+    text and namespaces, so repeated calls with the same text return the same Query.
+
+    Args:
+        query: SPARQL query text.
+        init_ns: Prefixes used but not declared in the query, in addition to the
+            default prefixes of rdflib (rdf, rdfs, owl, brick, ...).
+    """
+    return _prepare(query, tuple(sorted((init_ns or {}).items())))
+
+
+def run_query(graph: rdflib.Graph, query: str, init_bindings: dict = None,
+              init_ns: dict = None):
+    """
+    Evaluate a query on the graph like Graph.query, but with the cached compiled query.
+    """
+    return graph.query(prepare(query, init_ns), initBindings=init_bindings or {})
+
+
+def run_query_many(graph: rdflib.Graph, query: str, bindings: Iterable[dict],
+                   init_ns: dict = None) -> List[list]:
+    """
+    Evaluate one compiled query for many initial bindings, e.g. once per room.
+
+    Returns:
+        The result rows for each of the bindings, in the same order.
+    """
+    prepared = prepare(query, init_ns)
+    return [list(graph.query(prepared, initBindings=init_bindings))
+            for init_bindings in bindings]
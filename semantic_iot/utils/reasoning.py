@@ -3,6 +3,7 @@ import owlrl
 from rdflib.term import Literal
 from pathlib import Path
 from typing import Union
+from semantic_iot.utils.kg_store import is_kg_store, load_graph, save_graph
 
 def remove_redundant_triples(g: rdflib.Graph) -> rdflib.Graph:
     """
@@ -37,11 +38,14 @@ def inference_owlrl(
     knowledge graph is saved as a new Turtle file.
 
     Args:
-        targ_kg_path (Path): The path to the target knowledge graph file (e.g., "fiware.ttl").
+        targ_kg_path (Path): The path to the target knowledge graph file (e.g., "fiware.ttl"),
+                             or to a SQLite store (e.g., "fiware.sqlite"), see utils.kg_store.
         ontology_path (Path): The path to the ontology file (e.g., "Brick.ttl").
         output_filename (str, optional): The desired filename for the extended KG.
                                          If None, "_inferred.ttl" will be appended to the
                                          original target KG filename. Defaults to None.
+                                         A ".sqlite" or ".db" file name saves the
+                                         extended KG into a SQLite store.
 
     Returns:
         Path: The path to the newly created extended knowledge graph file.
@@ -62,10 +66,8 @@ def inference_owlrl(
     if not ontology_path.exists():
         raise FileNotFoundError(f"Ontology file not found: {ontology_path}")
 
-    g = rdflib.Graph()
-
     # Load target KG
-    g.parse(targ_kg_path)
+    g = load_graph(targ_kg_path, in_memory=True)
     print(f"Triples number original: {len(g)}")
 
     # Store triples of the original graph and extract its nodes
@@ -103,13 +105,16 @@ def inference_owlrl(
     # Determine output path
     if output_filename:
         extended_kg_path = targ_kg_path.parent.joinpath(output_filename)
+    elif is_kg_store(targ_kg_path):
+        extended_kg_path = targ_kg_path.with_name(
+            f"{targ_kg_path.stem}_inferred{targ_kg_path.suffix}")
     else:
         extended_kg_path = targ_kg_path.parent.joinpath(
             targ_kg_path.name.replace(".ttl", "_inferred.ttl")
         )
 
     # Serialize the filtered graph
-    g_filtered.serialize(extended_kg_path, format="turtle")
+    save_graph(g_filtered, extended_kg_path)
     print(f"Extended knowledge graph saved to: {extended_kg_path}")
 
     return extended_kg_path
@@ -0,0 +1,122 @@
+import json
+import logging
+from typing import Dict, Iterator, List, Union
+
+
+class ReportRelationship:
+    """Relationship of a node type in the intermediate report ("hasRelationship")."""
+    __slots__ = ("related_node_type", "property_class", "rawdataidentifier")
+
+    def __init__(self, related_node_type: str, rawdataidentifier: str,
+                 property_class: Union[list, str] = None):
+        self.related_node_type = related_node_type
+        self.rawdataidentifier = rawdataidentifier
+        self.property_class = property_class
+
+    def to_dict(self) -> dict:
+        return {
+            "relatedNodeType": self.related_node_type,
+            "propertyClass": self.property_class,
+            "rawdataidentifier": self.rawdataidentifier,
+        }
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ReportRelationship) and \
+            self.to_dict() == other.to_dict()
+
+
+class ReportItem:
+    """
+    Node type of the intermediate report. The raw entity it was created from and the
+    scored class suggestions are kept for the processing, but are not serialized.
+    """
+    __slots__ = ("nodetype", "iterator", "node_class", "relationships", "data_access",
+                 "entity", "class_with_score")
+
+    def __init__(self, nodetype: str, entity_type: str = None, entity: dict = None):
+        """
+        Args:
+            nodetype: Node type, e.g. "HotelRoom" or "fanSpeed_CoolingCoil".
+            entity_type: Entity type selected by the iterator. By default, the nodetype.
+            entity: Raw entity the node type was found in.
+        """
+        self.nodetype = nodetype
+        self.iterator = f"$[?(@.type=='{entity_type or nodetype}')]"
+        self.node_class = None
+        self.relationships: List[ReportRelationship] = []
+        self.data_access = None
+        self.entity = entity
+        self.class_with_score = None
+
+    def add_relationship(self, related_node_type: str,
+                         rawdataidentifier: str) -> ReportRelationship:
+        relationship = ReportRelationship(related_node_type, rawdataidentifier)
+        self.relationships.append(relationship)
+        return relationship
+
+    def to_dict(self) -> dict:
+        """The item in the JSON-LD shape of the intermediate report."""
+        return {
+            "nodetype": self.nodetype,
+            "iterator": self.iterator,
+            "class": self.node_class,
+            "hasRelationship": [r.to_dict() for r in self.relationships],
+            "hasDataAccess": self.data_access,
+        }
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ReportItem) and self.to_dict() == other.to_dict()
+
+
+class IntermediateReport:
+    """
+    Node types of the intermediate report of MappingPreprocess, in insertion order,
+    with an index from node type to its items for O(1) lookups. The relationships of
+    each item form the adjacency list of its node type.
+    """
+    def __init__(self, items: List[ReportItem] = None):
+        self.items: List[ReportItem] = []
+        self._index: Dict[str, List[ReportItem]] = {}
+        for item in items or []:
+            self.add(item)
+
+    def add(self, item: ReportItem):
+        self.items.append(item)
+        self._index.setdefault(item.nodetype, []).append(item)
+
+    def extend(self, items: List[ReportItem]):
+        for item in items:
+            self.add(item)
+
+    def get(self, nodetype: str) -> Union[ReportItem, None]:
+        """First item of the node type, None if the node type is not in the report."""
+        items = self._index.get(nodetype)
+        return items[0] if items else None
+
+    def __contains__(self, nodetype: str) -> bool:
+        return nodetype in self._index
+
+    def __iter__(self) -> Iterator[ReportItem]:
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def drop_duplicates(self) -> "IntermediateReport":
+        """Keep the first item of each node type, warn if the dropped ones differ."""
+        for nodetype, items in self._index.items():
+            if not all(item == items[0] for item in items[1:]):
+                logging.warning(f"Differences are found for the same resource type "
+                                f"'{nodetype}'")
+                for item in items:
+                    print(json.dumps(item.to_dict(), indent=2))
+        self.items = [items[0] for items in self._index.values()]
+        self._index = {item.nodetype: [item] for item in self.items}
+        return self
+
+    def sort(self):
+        """Sort the items by node type in alphabetical order."""
+        self.items.sort(key=lambda item: item.nodetype.lower())
+
+    def to_list(self) -> List[dict]:
+        return [item.to_dict() for item in self.items]
@@ -0,0 +1,81 @@
+from typing import Any, List, Union
+from jsonpath_ng import parse
+from jsonpath_ng.jsonpath import Child, Descendants, Fields, Root
+
+# path element of the items of a list, see key_paths
+LIST_ITEM = object()
+
+
+def key_paths(entity: Any, prefix: tuple = ()) -> tuple:
+    """
+    Key index of an entity: the paths of all keys of all nested dicts, with LIST_ITEM
+    for list items. It only depends on the structure of the entity, entities of the
+    same type usually share it.
+    """
+    paths = []
+    if isinstance(entity, dict):
+        for key, value in entity.items():
+            path = prefix + (key,)
+            paths.append(path)
+            paths.extend(key_paths(value, path))
+    elif isinstance(entity, list):
+        for value in entity:
+            paths.extend(key_paths(value, prefix + (LIST_ITEM,)))
+    return tuple(paths)
+
+
+def _single_field(expr) -> Union[str, None]:
+    if isinstance(expr, Fields) and len(expr.fields) == 1 and expr.fields[0] != "*":
+        return expr.fields[0]
+    return None
+
+
+class SplitPattern:
+    """
+    JSONPath pattern of MappingPreprocess.patterns_splitting. The common shapes are
+    evaluated on the key index of an entity (key_paths) instead of with jsonpath-ng:
+        $..key          recursive descent to a key
+        $.key1.key2     chain of keys from the root
+    Their result only depends on the key index, so it can be reused for all entities
+    with the same key index. Other patterns (filters, slices, wildcards, ...) are
+    evaluated with jsonpath-ng.
+    """
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.jsonpath = parse(pattern)
+        self.descendant_key = None
+        self.key_chain = None
+
+        expr = self.jsonpath
+        if isinstance(expr, Descendants) and isinstance(expr.left, Root):
+            self.descendant_key = _single_field(expr.right)
+        else:
+            chain = []
+            while isinstance(expr, Child) and _single_field(expr.right) is not None:
+                chain.append(_single_field(expr.right))
+                expr = expr.left
+            if chain and isinstance(expr, Root):
+                self.key_chain = tuple(reversed(chain))
+
+    @property
+    def structural(self) -> bool:
+        """The matches only depend on the key index of the entity."""
+        return self.descendant_key is not None or self.key_chain is not None
+
+    def matched_fields(self, entity: dict, paths: tuple = None) -> List[str]:
+        """
+        Name of the matched field of each match, in the order of jsonpath-ng.
+
+        Args:
+            entity: The entity.
+            paths: key_paths(entity), if it is already known.
+        """
+        if not self.structural:
+            return [match.path.fields[0] for match in self.jsonpath.find(entity)]
+        if paths is None:
+            paths = key_paths(entity)
+        if self.descendant_key is not None:
+            # one match per dict (at any depth) that contains the key
+            return [self.descendant_key] * sum(1 for path in paths
+                                               if path[-1] == self.descendant_key)
+        return [self.key_chain[-1]] if self.key_chain in set(paths) else []
@@ -0,0 +1,140 @@
+import gzip
+import re
+from pathlib import Path
+from typing import Iterator, TextIO, Union
+from rdflib import Literal, URIRef
+from rdflib.namespace import RDF
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+from semantic_iot.utils.kg_store import is_kg_store, load_graph
+
+
+def open_text(path: Union[Path, str], mode: str = "r") -> TextIO:
+    """
+    Open a (optionally gzip compressed) text file, e.g. "kg.nt" or "kg.nt.gz".
+    """
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def guess_format(path: Union[Path, str]) -> str:
+    """
+    Guess the RDF serialization ("nt" or "turtle") from the file name, ignoring ".gz".
+    """
+    path = Path(path)
+    if path.suffix == ".gz":
+        path = path.with_suffix("")
+    return "nt" if path.suffix in (".nt", ".ntriples") else "turtle"
+
+
+class _TripleBuffer:
+    """Sink for W3CNTriplesParser that keeps the triples of the current line."""
+    def __init__(self):
+        self.triples = []
+
+    def triple(self, s, p, o):
+        self.triples.append((s, p, o))
+
+
+def iter_ntriples(path: Union[Path, str]) -> Iterator[tuple]:
+    """
+    Iterate over the triples of an N-Triples file line by line, so that memory
+    usage does not depend on the size of the file.
+    """
+    buffer = _TripleBuffer()
+    parser = W3CNTriplesParser(sink=buffer)
+    # blank node labels are shared by all lines of the file
+    bnode_context = {}
+    with open_text(path) as f:
+        for line in f:
+            parser.parsestring(line, bnode_context=bnode_context)
+            yield from buffer.triples
+            buffer.triples.clear()
+
+
+# rdf:value with an IRI object (or a comma separated list of IRIs) in Turtle
+_TURTLE_PREFIX = re.compile(r"@prefix\s+([\w-]*):\s*<([^>]*)>", re.IGNORECASE)
+_TURTLE_IRI = re.compile(r"<([^>]*)>")
+
+
+def _iter_turtle_value_uris(path: Union[Path, str]) -> Iterator[URIRef]:
+    """
+    Scan a Turtle file line by line for rdf:value objects.
+
+    This is not a full Turtle parser. It covers the layout written by rdflib and
+    morph-kgc, i.e. "rdf:value <iri>" on one line with the object as full IRI.
+    """
+    value_predicates = {f"<{RDF.value}>"}
+    value_statement = None
+    with open_text(path) as f:
+        for line in f:
+            prefix = _TURTLE_PREFIX.search(line)
+            if prefix and prefix.group(2) == str(RDF):
+                value_predicates.add(f"{prefix.group(1)}:value")
+                value_statement = None
+                continue
+            if value_statement is None:
+                value_statement = re.compile(
+                    r"(?:^|[\s;\[])(?:" + "|".join(re.escape(p) for p in value_predicates)
+                    + r")\s+(<[^>]*>(?:\s*,\s*<[^>]*>)*)"
+                )
+            match = value_statement.search(line)
+            if match:
+                for iri in _TURTLE_IRI.findall(match.group(1)):
+                    yield URIRef(iri)
+
+
+def iter_value_uris(path: Union[Path, str], rdf_format: str = None) -> Iterator[URIRef]:
+    """
+    Stream the IRI objects of all rdf:value triples of a KG file (N-Triples or Turtle,
+    optionally gzip compressed) without loading the KG into a graph. A KG in the
+    SQLite store is read from its POS index.
+    """
+    if rdf_format is None and is_kg_store(path):
+        graph = load_graph(path)
+        yield from (o for o in graph.objects(None, RDF.value) if isinstance(o, URIRef))
+        graph.close()
+        return
+    rdf_format = rdf_format or guess_format(path)
+    if rdf_format in ("nt", "ntriples"):
+        for s, p, o in iter_ntriples(path):
+            if p == RDF.value and isinstance(o, URIRef):
+                yield o
+    elif rdf_format in ("turtle", "ttl"):
+        yield from _iter_turtle_value_uris(path)
+    else:
+        raise ValueError(f"Unsupported format for streaming: {rdf_format}. "
+                         f"Use 'nt' or 'turtle'.")
+
+
+# N-Triples escapes of literal strings (ECHAR), Literal.n3() may use Turtle long strings
+_NT_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def nt_term(term) -> str:
+    """N-Triples form of an rdflib term."""
+    if isinstance(term, Literal):
+        lexical = f'"{str(term).translate(_NT_ESCAPES)}"'
+        if term.language:
+            return f"{lexical}@{term.language}"
+        if term.datatype:
+            return f"{lexical}^^{term.datatype.n3()}"
+        return lexical
+    return term.n3()
+
+
+class NTriplesWriter:
+    """
+    Write triples to a text stream as N-Triples. Offers the add() method of
+    rdflib.Graph, so that it can be used in place of a graph.
+    """
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.count = 0
+
+    def add(self, triple: tuple):
+        s, p, o = triple
+        self.stream.write(f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n")
+        self.count += 1
+        return self
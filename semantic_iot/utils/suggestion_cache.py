@@ -0,0 +1,130 @@
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Union
+from rdflib import URIRef
+
+DEFAULT_MAX_ENTRIES = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS suggestions (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS suggestions_last_used ON suggestions (last_used);
+"""
+
+
+def ontology_digest(ontology_file_paths: Iterable[Union[Path, str]]) -> str:
+    """Content hash of the ontology files, in the given order."""
+    digest = hashlib.sha256()
+    for path in ontology_file_paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def suggestion_key(kind: str, ontology: str, similarity_mode: str, threshold: float,
+                   keyword: str, subjects: dict = None, objects: dict = None) -> str:
+    """
+    Key of a terminology suggestion.
+
+    Args:
+        kind: "class" or "property".
+        ontology: Digest of the ontology files, see ontology_digest.
+        similarity_mode: "string" or "semantic".
+        threshold: Threshold for property suggestion.
+        keyword: Normalized node type or attribute path.
+        subjects: Scored subject classes of a property suggestion.
+        objects: Scored object classes of a property suggestion.
+    """
+    return hashlib.sha256(json.dumps([
+        kind, ontology, similarity_mode, threshold, keyword,
+        sorted((str(iri), score) for iri, score in (subjects or {}).items()),
+        sorted((str(iri), score) for iri, score in (objects or {}).items()),
+    ]).encode()).hexdigest()
+
+
+def _encode(suggestion: dict) -> str:
+    # keep whether an IRI is a URIRef, they are not equal to plain strings in rdflib
+    return json.dumps([[str(iri), score, isinstance(iri, URIRef)]
+                       for iri, score in suggestion.items()])
+
+
+def _decode(value: str) -> dict:
+    return {URIRef(iri) if is_uriref else iri: score
+            for iri, score, is_uriref in json.loads(value)}
+
+
+# next value of the logical clock of the LRU order, persisted in last_used
+_NEXT_TICK = "(SELECT COALESCE(MAX(last_used), 0) + 1 FROM suggestions)"
+
+
+class SuggestionCache:
+    def __init__(self, path: Union[Path, str], max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Persistent cache of terminology suggestions ({iri: score}) of MappingPreprocess,
+        shared by preprocessing runs. The least recently used suggestions are evicted
+        when there are more than max_entries. Every change is committed immediately,
+        so several processors (or processes) can share the cache file.
+
+        Args:
+            path: Path of the SQLite cache file, created if it does not exist.
+            max_entries: Maximum number of stored suggestions.
+        """
+        self.path = Path(path)
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # autocommit, with the write-ahead log to keep the commits cheap
+        self.connection = sqlite3.connect(str(self.path), isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM suggestions").fetchone()[0]
+
+    def get(self, key: str) -> Union[dict, None]:
+        """The stored suggestion, None if there is none."""
+        row = self.connection.execute(
+            "SELECT value FROM suggestions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute(
+            f"UPDATE suggestions SET last_used = {_NEXT_TICK} WHERE key = ?", (key,))
+        return _decode(row[0])
+
+    def put(self, key: str, suggestion: dict):
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO suggestions VALUES (?, ?, {_NEXT_TICK})",
+            (key, _encode(suggestion)))
+        # other connections may have added entries, count them instead of tracking
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM suggestions WHERE key IN "
+                "(SELECT key FROM suggestions ORDER BY last_used LIMIT ?)", (excess,))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,5 +1,5 @@
 from pathlib import Path
-from semantic_iot import RDFGenerator, APIPostprocessor
+from semantic_iot import RDFGenerator, APIBatchPostprocessor
 
 # Path to HTTP ontology and OpenAPI spec (adjust as needed)
 HTTP_ONTO = Path(__file__).parent.parent / f'examples/fiware/ontologies/Http.ttl'
@@ -17,6 +17,8 @@ if __name__ == '__main__':
         platform_config=str(config_file)
     )
 
+    kg_paths = []
+    output_paths = []
     for hotel in (
             'fiware_entities_2rooms',
             'fiware_entities_10rooms',
@@ -38,12 +40,13 @@ if __name__ == '__main__':
                 engine='morph-kgc'
             )
         out_ext = project_root / f'test/results/{hotel}_extended.ttl'
+        kg_paths.append(dst)
+        output_paths.append(out_ext)
 
-        postprocessor = APIPostprocessor(
-            kg_path=dst,
-            api_spec_path=OPENAPI,
-            http_onto=HTTP_ONTO
-        )
-        postprocessor.extend_kg()
-        postprocessor.kg.serialize(destination=str(out_ext), format='turtle')
+    # The spec is parsed once and shared by all hotels
+    postprocessor = APIBatchPostprocessor(
+        api_spec_path=OPENAPI,
+        http_onto=HTTP_ONTO
+    )
+    postprocessor.extend_kgs(kg_paths, output_paths)
 
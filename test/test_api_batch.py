@@ -0,0 +1,20 @@
+import shutil
+from pathlib import Path
+from rdflib import Graph
+from semantic_iot.API_postprocessor import APIBatchPostprocessor
+
+KG = Path(__file__).parent / "results/fiware_entities_2rooms.ttl"
+API_SPEC = Path(__file__).parent.parent / "examples/fiware/kgcp/api_spec.json"
+
+
+def test_streaming_writes_http_ontology(tmp_path):
+    kg = tmp_path / "kg.ttl"
+    shutil.copy(KG, kg)
+    batch = APIBatchPostprocessor(API_SPEC)
+    http_only = Graph().parse(
+        batch.extend_kgs([kg], streaming=True, max_workers=1)[0], format="nt")
+    with_ontology = Graph().parse(
+        batch.extend_kgs([kg], add_http_ontology=True, streaming=True,
+                         max_workers=1)[0], format="nt")
+    ontology = Graph().parse(batch.http_onto, format="turtle")
+    assert len(with_ontology) == len(http_only) + len(ontology)
@@ -0,0 +1,73 @@
+from pathlib import Path
+import pytest
+from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib.compare import isomorphic
+from rdflib.namespace import RDF, XSD
+from semantic_iot.utils import kg_store
+from semantic_iot.utils.kg_store import load_graph, save_graph
+
+KG = Path(__file__).parent / "results/fiware_entities_2rooms.ttl"
+EX = Namespace("http://example.com/")
+
+
+def sample_graph() -> Graph:
+    graph = Graph().parse(KG, format="turtle")
+    node = BNode()
+    graph.add((EX.room, EX.hasPart, node))
+    graph.add((node, RDF.value, Literal("a \"quoted\"\nmultiline text", lang="en")))
+    graph.add((node, EX.total, Literal(3, datatype=XSD.integer)))
+    graph.add((node, EX.ratio, Literal("0.5", datatype=XSD.decimal)))
+    graph.bind("ex", EX)
+    return graph
+
+
+def test_store_round_trip(tmp_path):
+    """A KG saved into the store loads with the same triples as its Turtle file."""
+    graph = sample_graph()
+    save_graph(graph, tmp_path / "kg.ttl")
+    save_graph(graph, tmp_path / "kg.sqlite")
+
+    turtle_kg = load_graph(tmp_path / "kg.ttl")
+    store_kg = load_graph(tmp_path / "kg.sqlite")
+    assert len(store_kg) == len(turtle_kg) == len(graph)
+    assert isomorphic(store_kg, turtle_kg)
+    assert dict(store_kg.namespaces())["ex"] == URIRef(EX)
+    # lookups by pattern use the indexes of the store
+    assert len(set(store_kg.objects(EX.room, EX.hasPart))) == 1
+    assert len(list(store_kg.triples((None, RDF.value, None)))) == \
+        len(list(turtle_kg.triples((None, RDF.value, None))))
+    store_kg.close()
+
+    memory_kg = load_graph(tmp_path / "kg.sqlite", in_memory=True)
+    assert isomorphic(memory_kg, turtle_kg)
+
+
+def test_store_is_replaced(tmp_path):
+    graph = sample_graph()
+    save_graph(graph, tmp_path / "kg.db")
+    smaller = Graph()
+    smaller.add((EX.a, EX.b, EX.c))
+    save_graph(smaller, tmp_path / "kg.db")
+    assert isomorphic(load_graph(tmp_path / "kg.db", in_memory=True), smaller)
+
+
+def test_store_with_small_caches(tmp_path, monkeypatch):
+    """Triples are read in chunks and terms evicted from the caches are read again."""
+    monkeypatch.setattr(kg_store, "TERM_CACHE_SIZE", 8)
+    monkeypatch.setattr(kg_store, "FETCH_SIZE", 5)
+    graph = sample_graph()
+    save_graph(graph, tmp_path / "kg.sqlite")
+    store_kg = load_graph(tmp_path / "kg.sqlite")
+    assert isomorphic(store_kg, graph)
+    assert len(store_kg.store._terms) <= 8
+    assert len(store_kg.store._ids) <= 8
+    store_kg.close()
+
+
+@pytest.mark.parametrize("suffix, rdf_format", [
+    (".nt", "nt"), (".jsonld", "json-ld"), (".rdf", "xml"), (".xml", "xml"), (".ttl", "turtle")])
+def test_load_graph_guesses_format(tmp_path, suffix, rdf_format):
+    graph = sample_graph()
+    path = tmp_path / f"kg{suffix}"
+    graph.serialize(destination=str(path), format=rdf_format)
+    assert isomorphic(load_graph(path), graph)
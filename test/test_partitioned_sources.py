@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+from rdflib import Graph
+from rdflib.compare import isomorphic
+from semantic_iot import RDFGenerator, RMLMappingGenerator
+
+FIWARE_DIR = Path(__file__).parent.parent / "examples/fiware"
+REPORT = FIWARE_DIR / "kgcp/rml/brick/intermediate_report_validated_brick.json"
+CONFIG = FIWARE_DIR / "kgcp/rml/fiware_config.json"
+HOTEL = FIWARE_DIR / "hotel_dataset/fiware_entities_2rooms.json"
+
+
+def generate_kg(tmp_path: Path, source_file: Path, partition_sources: bool) -> Graph:
+    mapping_file = tmp_path / f"rml_{partition_sources}.ttl"
+    rml_generator = RMLMappingGenerator(
+        rdf_relationship_file=str(REPORT),
+        output_file=str(mapping_file),
+        entities_file=str(source_file),
+        partition_sources=partition_sources
+    )
+    rml_generator.load_intermediate_reports()
+    rml_generator.create_mapping_file()
+
+    destination = tmp_path / f"kg_{partition_sources}.ttl"
+    rdf_gen = RDFGenerator(
+        mapping_file=str(mapping_file),
+        platform_config=str(CONFIG),
+        partition_sources=partition_sources,
+        preprocess_file=str(tmp_path / f"preprocessed_{partition_sources}.json")
+    )
+    rdf_gen.generate_rdf(source_file=str(source_file), destination_file=str(destination))
+    return Graph().parse(destination, format="turtle")
+
+
+def test_dataset_without_a_mapped_type(tmp_path):
+    """A type of the mapping without entities gets an empty in-memory source."""
+    with open(HOTEL, "r") as f:
+        entities = [entity for entity in json.load(f) if entity["type"] != "CO2Sensor"]
+    source_file = tmp_path / "hotel_without_co2.json"
+    with open(source_file, "w") as f:
+        json.dump(entities, f)
+
+    file_kg = generate_kg(tmp_path, source_file, partition_sources=False)
+    partitioned_kg = generate_kg(tmp_path, source_file, partition_sources=True)
+    assert len(file_kg) > 0
+    assert isomorphic(file_kg, partitioned_kg)
@@ -0,0 +1,78 @@
+from pathlib import Path
+from semantic_iot.pipeline import STAGES, PipelineRunner, _publish_entry, stage_fingerprint
+
+FIWARE_DIR = Path(__file__).parent.parent / "examples/fiware"
+
+
+def manifest(tmp_path: Path) -> dict:
+    return {
+        "stages": ["rml", "rdf", "http"],
+        "defaults": {
+            "report": str(FIWARE_DIR / "kgcp/rml/brick/intermediate_report_validated_brick.json"),
+            "platform_config": str(FIWARE_DIR / "kgcp/rml/fiware_config.json"),
+            "api_spec": str(FIWARE_DIR / "kgcp/api_spec.json"),
+            "output_dir": str(tmp_path / "output"),
+        },
+        "hotels": [
+            {"name": "hotel_2rooms",
+             "data": str(FIWARE_DIR / "hotel_dataset/fiware_entities_2rooms.json")},
+        ],
+    }
+
+
+def test_second_run_is_up_to_date(tmp_path, capsys):
+    runner = PipelineRunner(manifest(tmp_path), cache_dir=tmp_path / "cache")
+    first = runner.run()
+    first_output = capsys.readouterr().out
+    assert "[hotel_2rooms] rml: running" in first_output
+
+    second = runner.run()
+    second_output = capsys.readouterr().out
+    for stage in ("rml", "rdf", "http"):
+        assert f"[hotel_2rooms] {stage}: up to date" in second_output
+    assert "running" not in second_output
+    assert first == second
+    for artifact in second["hotel_2rooms"].values():
+        assert artifact.exists()
+
+
+def test_publish_keeps_existing_entry(tmp_path):
+    """A concurrently published entry is reused, not deleted and replaced."""
+    entry_dir = tmp_path / "entry"
+    entry_dir.mkdir()
+    artifact = entry_dir / "artifact.ttl"
+    artifact.write_text("published")
+    marker = entry_dir / "in_use"
+    marker.write_text("")
+
+    tmp_dir = tmp_path / "entry.tmp"
+    tmp_dir.mkdir()
+    (tmp_dir / "artifact.ttl").write_text("rerun")
+    _publish_entry(tmp_dir, entry_dir, artifact)
+    assert artifact.read_text() == "published"
+    assert marker.exists()
+
+    # forced reruns replace the artifact file atomically, the entry is kept
+    _publish_entry(tmp_dir, entry_dir, artifact, replace=True)
+    assert artifact.read_text() == "rerun"
+    assert marker.exists()
+
+
+def test_publish_new_entry(tmp_path):
+    tmp_dir = tmp_path / "entry.tmp"
+    tmp_dir.mkdir()
+    (tmp_dir / "artifact.ttl").write_text("new")
+    entry_dir = tmp_path / "entry"
+    _publish_entry(tmp_dir, entry_dir, entry_dir / "artifact.ttl")
+    assert (entry_dir / "artifact.ttl").read_text() == "new"
+    assert not tmp_dir.exists()
+
+
+def test_template_change_invalidates_rml(tmp_path):
+    template = tmp_path / "template.ttl.jinja2"
+    template.write_text("first")
+    stage = STAGES["rml"]._replace(templates=(str(template),))
+    job = manifest(tmp_path)["defaults"]
+    first = stage_fingerprint(stage, job)
+    template.write_text("second version")
+    assert stage_fingerprint(stage, job) != first